@@ -1,34 +1,152 @@
-import spacy
 import os
 import re
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
 from collections import Counter
-import string
-from nltk.tokenize import sent_tokenize
-
-try:
-    import pdfplumber
-    import docx
-except ImportError:
-    pdfplumber = None
-    docx = None
-
-try:
-    nltk.data.find('tokenizers/punkt')
-except:
-    nltk.download("punkt", quiet=True)
-
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    import contextlib, subprocess
-    with open(os.devnull, "w") as f, contextlib.redirect_stdout(f), contextlib.redirect_stderr(f):
-        subprocess.run(
-            ["python", "-m", "spacy", "download", "en_core_web_sm", "--quiet"],
-            stdout=f, stderr=f
-        )
-    nlp = spacy.load("en_core_web_sm")
+from cache import result_cache
+from doc_store import doc_store
+from instrument import stage, timed_iter
+from progress import emit
+from flowchart import compile_flowchart, parse_step
+from mermaid_writer import HEADERS as MERMAID_HEADERS, cap_graph, render_mermaid
+import graph_simplify
+from graph_simplify import simplify_graph, node_ranks
+
+from extractors import get_pdfplumber, iter_pdf_pages, iter_text_blocks, iter_docx_paragraphs
+
+MAX_PAGES = int(os.environ["VB_MAX_PAGES"]) if os.environ.get("VB_MAX_PAGES") else None
+MAX_CHARS = int(os.environ["VB_MAX_CHARS"]) if os.environ.get("VB_MAX_CHARS") else None
+# node / edge budget for diagrams, unset = no cap..
+MAX_NODES = int(os.environ["VB_MAX_NODES"]) if os.environ.get("VB_MAX_NODES") else None
+MAX_EDGES = int(os.environ["VB_MAX_EDGES"]) if os.environ.get("VB_MAX_EDGES") else None
+
+# heavy dependencies (spaCy, NLTK, pdfplumber, python-docx) are imported on the code path
+# that needs them, and nothing is ever downloaded while serving a request..
+_sent_tokenize = None
+
+def sent_tokenize(text):
+    """NLTK's punkt splitter, imported on first use; a regex split when NLTK or its punkt data is missing."""
+    global _sent_tokenize
+    if _sent_tokenize is None:
+        try:
+            from nltk.tokenize import sent_tokenize as punkt
+            # raises LookupError right away if the punkt data isn't installed..
+            punkt("Warm up.")
+            _sent_tokenize = punkt
+        except (ImportError, LookupError):
+            _sent_tokenize = lambda text: [s for s in SENTENCE_END_RE.split(text) if s.strip()]
+    return _sent_tokenize(text)
+
+# spaCy is loaded on first use only, flowchart and parse never pay for it..
+_nlp = None
+
+# components each NLP mode actually reads (pos_/lemma_/deps, plus ents for erDiagram)..
+PIPES_BY_MODE = {
+    "conceptMap": ("tok2vec", "tagger", "attribute_ruler", "lemmatizer", "parser"),
+    "erDiagram": ("tok2vec", "tagger", "attribute_ruler", "lemmatizer", "parser", "ner"),
+}
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        with stage("model_load"):
+            import spacy
+            try:
+                _nlp = spacy.load("en_core_web_sm")
+            except OSError:
+                # no download mid-request, the model is an install step..
+                raise OSError("spaCy model en_core_web_sm is not installed, run: python -m spacy download en_core_web_sm")
+    return _nlp
+
+def select_pipes_for(mode):
+    """Context manager that runs only the components mode needs."""
+    nlp = get_nlp()
+    return nlp.select_pipes(enable=[p for p in PIPES_BY_MODE[mode] if p in nlp.pipe_names])
+
+def parse_text(text, mode):
+    # one window of text is exactly what parse_chunks stores, so both share the parse..
+    if doc_store.enabled and len(text) <= CHUNK_CHARS:
+        return list(stored_parse(text))[0]
+    nlp = get_nlp()
+    with select_pipes_for(mode), stage("spacy_parse"):
+        return nlp(text)
+
+# long documents are parsed in windows of at most this many chars (spaCy's max_length is 1M)..
+CHUNK_CHARS = int(os.environ.get("VB_CHUNK_CHARS", "100000"))
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+def _split_long(piece, max_chars):
+    """Splits one oversized paragraph on sentence ends, and hard-splits run-on sentences at a space."""
+    for sent in SENTENCE_END_RE.split(piece):
+        while len(sent) > max_chars:
+            cut = sent.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            yield sent[:cut]
+            sent = sent[cut:].lstrip()
+        if sent:
+            yield sent
+
+def iter_chunks(text, max_chars=None):
+    """Yields windows of text up to max_chars, cut on paragraph, then sentence boundaries."""
+    if max_chars is None:
+        max_chars = CHUNK_CHARS
+    if len(text) <= max_chars:
+        yield text
+        return
+    window = []
+    size = 0
+    for paragraph in PARAGRAPH_RE.split(text):
+        pieces = [paragraph] if len(paragraph) <= max_chars else _split_long(paragraph, max_chars)
+        for piece in pieces:
+            if window and size + len(piece) + 2 > max_chars:
+                yield "\n\n".join(window)
+                window = []
+                size = 0
+            window.append(piece)
+            size += len(piece) + 2
+    if window:
+        yield "\n\n".join(window)
+
+def parse_chunks(text, mode, max_chars=None):
+    """
+    Streams Docs for the windows of text (a str, or an iterable of str blocks, see
+    iter_text_blocks); batch_size=1 keeps one window's Doc alive at a time.
+    """
+    if isinstance(text, str) and doc_store.enabled and len(text) <= doc_store.max_chars:
+        yield from stored_parse(text, max_chars)
+        return
+    pieces = [text] if isinstance(text, str) else text
+    chunks = (chunk for piece in pieces for chunk in iter_chunks(piece, max_chars))
+    with select_pipes_for(mode):
+        yield from timed_iter("spacy_parse", get_nlp().pipe(chunks, batch_size=1))
+
+def stored_parse(text, max_chars=None):
+    """
+    Docs for the windows of text.strip(), deserialized from doc_store when this text was
+    parsed before. Otherwise parsed now with erDiagram's components (a superset of
+    conceptMap's, so any NLP mode can reuse it) and stored once fully read.
+    """
+    if max_chars is None:
+        max_chars = CHUNK_CHARS
+    nlp = get_nlp()
+    # conceptMap parses its segments joined, which is text.strip() for plain prose..
+    text = text.strip()
+    key = doc_store.key(nlp, text, max_chars)
+    with stage("doc_load"):
+        docs = doc_store.load(nlp, key)
+    if docs is not None:
+        yield from docs
+        return
+
+    from spacy.tokens import DocBin
+    doc_bin = DocBin(store_user_data=False)
+    with select_pipes_for("erDiagram"):
+        for doc in timed_iter("spacy_parse", nlp.pipe(iter_chunks(text, max_chars), batch_size=1)):
+            doc_bin.add(doc)
+            yield doc
+    with stage("doc_store"):
+        doc_store.save(key, doc_bin)
+
 # here, we're normalizing entities 
 def normalize_entity(name):
     """Standard cleanup: remove leading/trailing articles and common stop words for comparison."""
@@ -40,99 +158,148 @@ def normalize_entity(name):
     name = re.sub(r'[.,;:`\'"]', '', name)
     return name.strip()
 
+# sub-phrases longer than this are never looked up, keeps the per-name cost small..
+MAX_ALIAS_WORDS = 6
+
+def _master_rank(name):
+    # longer spelling wins, ties broken alphabetically so the result doesn't depend on set order..
+    return (-len(name), name)
+
 def consolidate_entities(entities):
     """
-    Groups entities with similar normalized forms, prioritizing the longest entity
-    as the 'master' name. Also checks for partial containment.
+    Maps every entity to its 'master' name: the longest entity whose normalized form contains
+    this one's as a whole-word phrase ("cache" -> "the result cache"), or, for an acronym,
+    the longest entity whose initials spell it ("LRU" -> "least recently used").
+    Each name's sub-phrases are looked up in a dict instead of comparing every pair of names,
+    so the cost is linear in the no. of entities.
     """
     if not entities:
         return {}
-    
-    consolidation_map = {}
-    
-    sorted_entities = sorted(list(set(entities)), key=len, reverse=True)
-    
-    for entity in sorted_entities:
+
+    # longest original spelling per normalized form..
+    masters = {}
+    for entity in sorted(set(entities), key=_master_rank):
         norm = normalize_entity(entity)
-        if norm and norm not in consolidation_map:
-            consolidation_map[norm] = entity
-            
+        if norm and norm not in masters:
+            masters[norm] = entity
+
+    best = dict(masters)
+    by_initials = {}
+    for norm, master in masters.items():
+        words = norm.split()
+        n = len(words)
+        for size in range(1, min(n - 1, MAX_ALIAS_WORDS) + 1):
+            for start in range(n - size + 1):
+                sub = " ".join(words[start:start + size])
+                current = best.get(sub)
+                if current is not None and _master_rank(master) < _master_rank(current):
+                    best[sub] = master
+        if n > 1:
+            initials = "".join(w[0] for w in words)
+            current = by_initials.get(initials)
+            if current is None or _master_rank(master) < _master_rank(current):
+                by_initials[initials] = master
+
+    for norm, master in masters.items():
+        if " " not in norm and master.isupper() and norm in by_initials:
+            alias = by_initials[norm]
+            if _master_rank(alias) < _master_rank(best[norm]):
+                best[norm] = alias
+
     # doing final mapping here ..
     final_map = {}
     for entity in entities:
-        norm = normalize_entity(entity)
-        best_match = consolidation_map.get(norm, entity)
-        for n_key, master in consolidation_map.items():
-            if norm != n_key and (norm in n_key or n_key in norm):
-                
-                if len(master) > len(best_match) or best_match == entity:
-                    best_match = master
-                
-        final_map[entity] = best_match
-        
+        final_map[entity] = best.get(normalize_entity(entity), entity)
     return final_map
 
 # Parsing the file..
-def parse_file(file_path):
+def parse_file(file_path, max_pages=MAX_PAGES, max_chars=MAX_CHARS, workers=None):
     """Parses text from PDF, DOCX, or plain text files."""
-    if file_path.endswith(".pdf") and pdfplumber:
+    with stage("parse_file"):
+        return read_file(file_path, max_pages, max_chars, workers)
+
+def read_file(file_path, max_pages=MAX_PAGES, max_chars=MAX_CHARS, workers=None):
+    if file_path.endswith(".pdf") and get_pdfplumber():
+        try:
+            return "\n".join(iter_pdf_pages(file_path, max_pages, max_chars, workers))
+        except Exception:
+            pass
+    elif file_path.endswith(".docx"):
         try:
-            with pdfplumber.open(file_path) as pdf:
-                return "\n".join([p.extract_text() or "" for p in pdf.pages])
+            return "\n".join(iter_docx_paragraphs(file_path, max_chars))
         except Exception:
             pass
-    elif file_path.endswith(".docx") and docx:
+        # python-docx is only the fallback now, e.g. for files the streaming reader chokes on..
         try:
+            import docx
             doc = docx.Document(file_path)
             return "\n".join([p.text for p in doc.paragraphs])
         except Exception:
             pass
     elif os.path.exists(file_path):
         try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                return f.read()
+            return "".join(iter_text_blocks(file_path, max_chars))
         except Exception:
             pass
     return ""
 
-# Summarizing..
-def generate_summary(text, n=5):
-    from nltk.corpus import stopwords
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-    
-    stop_words = set(stopwords.words('english'))
-    sentences = sent_tokenize(text)
-    
-    words = [word.lower() for word in word_tokenize(text) if word.isalpha() and word.lower() not in stop_words]
-    freq = Counter(words)
-    
-    sentence_scores = {}
-    for sent in sentences:
-        sent_words = [w.lower() for w in word_tokenize(sent) if w.isalpha()]
-        score = sum(freq.get(w,0) for w in sent_words)
-        sentence_scores[sent] = score
-    
-    top_sentences = sorted(sentence_scores, key=sentence_scores.get, reverse=True)[:n]
-    
-    summary = " ".join(top_sentences)
-    return {"title": "Document Summary", "content": summary}
+# plain-text files this big are summarized / diagrammed block by block, never as one str..
+STREAM_MIN_BYTES = int(float(os.environ.get("VB_STREAM_MIN_MB", "32")) * 1024 * 1024)
 
+def is_streamable(file_path):
+    return (
+        not file_path.endswith((".pdf", ".docx"))
+        and os.path.isfile(file_path)
+        and os.path.getsize(file_path) >= STREAM_MIN_BYTES
+    )
 
-def consolidate_entities(entities):
-    mapping = {}
-    for e in entities:
-        key = e.lower().replace("\n"," ").strip()
-        mapping[e] = key
-    return mapping
+# Summarizing..
+def summary_vectors(scoring):
+    """
+    Word vectors for the embedding scorings (textrank / mmr): the spaCy model's static
+    vectors if it's already loaded and ships any, else None (hashed n-gram vectors).
+    Never loads the model just for a summary.
+    """
+    from summarizer import EMBEDDING_SCORINGS
+    if scoring in EMBEDDING_SCORINGS and _nlp is not None and _nlp.vocab.vectors.shape[0]:
+        return _nlp.vocab.vectors
+    return None
+
+def generate_summary(text, n=5, sentences=None, scoring="frequency", length_norm=False):
+    """Cached front for summarize(); sentences from a shared Doc get their own key."""
+    # summarizer pulls in numpy, only summary requests pay for that import..
+    from summarizer import EMBEDDING_SCORINGS
+    segmenter = "nltk" if sentences is None else "shared"
+    params = {"n": n, "segmenter": segmenter, "scoring": scoring, "length_norm": length_norm}
+    if scoring in EMBEDDING_SCORINGS:
+        params["vectors"] = "hashed" if summary_vectors(scoring) is None else "spacy"
+    return result_cache.cached(
+        "summary", text, lambda: summarize(text, n, sentences, scoring, length_norm), **params
+    )
+
+def summarize_blocks(blocks, n=5, scoring="frequency", length_norm=False):
+    """summarize() over text blocks; only the sentence list is kept, not the whole text."""
+    sentences = []
+    for block in blocks:
+        with stage("tokenize"):
+            sentences.extend(sent_tokenize(block))
+    return summarize(None, n, sentences, scoring, length_norm)
+
+def summarize(text, n=5, sentences=None, scoring="frequency", length_norm=False):
+    """Top-n sentences (scoring: "frequency", "tfidf", "textrank" or "mmr") joined in document order."""
+    from summarizer import top_sentences
+    if sentences is None:
+        with stage("tokenize"):
+            sentences = sent_tokenize(text)
+
+    with stage("summary_scoring"):
+        summary = " ".join(top_sentences(sentences, n, scoring, length_norm, summary_vectors(scoring)))
+    emit("sentences", scored=len(sentences))
+    return {"title": "Document Summary", "content": summary}
 
-def extract_entities_relations(text):
-    if not text or not text.strip():
-        return [], []
 
-    doc = nlp(text)
-    raw_entities = set()
-    raw_relations = set()
+def collect_entities_relations(doc, raw_entities, raw_relations):
+    """Adds the raw (unconsolidated) entities and relations of one Doc to the given sets."""
     noun_chunk_map = {}
 
     for chunk in doc.noun_chunks:
@@ -207,31 +374,54 @@ def extract_entities_relations(text):
                             if obj_name:
                                 raw_relations.add((subj_name, f"{child.lemma_}_ref", obj_name))
 
+def extract_entities_relations(text, doc=None):
+    """text is a str or an iterable of str blocks (parsed chunk by chunk either way)."""
+    if not text or (isinstance(text, str) and not text.strip()):
+        return [], []
+
+    raw_entities = set()
+    raw_relations = set()
+    # long texts are parsed window by window, only one chunk's Doc is alive at a time;
+    # entity names are plain strings so the sets dedupe across chunk boundaries..
+    docs = [doc] if doc is not None else parse_chunks(text, "erDiagram")
+    for chunks, chunk_doc in enumerate(docs, 1):
+        with stage("entities"):
+            collect_entities_relations(chunk_doc, raw_entities, raw_relations)
+        emit("entities", chunks=chunks, entities=len(raw_entities), relations=len(raw_relations))
+    with stage("entities"):
+        return assemble_entities_relations(raw_entities, raw_relations)
+
+def assemble_entities_relations(raw_entities, raw_relations):
+    """Consolidates raw names and builds the final (sorted entities, relations) pair."""
     all_entities = list(raw_entities)
     consolidation_map = consolidate_entities(all_entities)
-    final_entities = set(consolidation_map.values())
-    final_relations = []
+    final_entities = sorted(set(consolidation_map.values()))
+    # dict as an ordered set, plus neighbours per entity for the orphan pass..
+    final_relations = {}
+    adjacency = {e: set() for e in final_entities}
 
-    for subj, verb, obj in raw_relations:
+    # sorted so the edge order doesn't depend on set / hash order between runs..
+    for subj, verb, obj in sorted(raw_relations):
         final_subj = consolidation_map.get(subj, subj)
         final_obj = consolidation_map.get(obj, obj)
-        if final_subj in final_entities and final_obj in final_entities and final_subj != final_obj:
+        if final_subj in adjacency and final_obj in adjacency and final_subj != final_obj:
             clean_verb = re.sub(r'\s+','_', verb.strip().lower())
             relation_tuple = (final_subj, clean_verb, final_obj)
             if relation_tuple not in final_relations:
-                final_relations.append(relation_tuple)
-
-    connected_entities = set()
-    for s,o in [(x[0],x[2]) for x in final_relations]:
-        connected_entities.add(s)
-        connected_entities.add(o)
-    for e in final_entities:
-        if e not in connected_entities:
-            main_entity = list(final_entities)[0]
+                final_relations[relation_tuple] = None
+                adjacency[final_subj].add(final_obj)
+                adjacency[final_obj].add(final_subj)
+
+    orphans = [e for e in final_entities if not adjacency[e]]
+    if orphans:
+        # hub = best connected entity, then the one most names were merged into, then by name..
+        aliases = Counter(consolidation_map.values())
+        main_entity = min(final_entities, key=lambda e: (-len(adjacency[e]), -aliases[e], e))
+        for e in orphans:
             if e != main_entity:
-                final_relations.append((main_entity,"related_to", e))
+                final_relations[(main_entity, "related_to", e)] = None
 
-    return sorted(list(final_entities)), final_relations
+    return final_entities, list(final_relations)
 
 
 # generating diag. according to type..
@@ -242,300 +432,421 @@ def create_safe_id(name):
         safe = "C_" + safe
     return safe[:30] 
 
-def generate_diagram(text, diagram_type="erDiagram"):
+def split_concept_segments(text):
+    """conceptMap input: ';' segments with '->' are explicit edges, the rest go to spaCy."""
+    arrow_segments = []
+    nlp_segments = []
+    for segment in (s.strip() for s in text.split(';')):
+        if not segment:
+            continue
+        if '->' in segment:
+            arrow_segments.append(segment)
+        else:
+            nlp_segments.append(segment)
+    return arrow_segments, nlp_segments
+
+def er_graph(final_entities, final_relations):
+    # ids come from the label, so they're stable between runs..
+    entity_ids = {e: create_safe_id(e) for e in final_entities}
+    nodes = [{"id": entity_ids[label], "label": label} for label in final_entities]
+    edges = [{"from": entity_ids[s], "to": entity_ids[o], "label": v} for s, v, o in final_relations]
+    return nodes, edges
+
+def arrow_triples(segment):
+    """"A -> B, C" gives (A, includes, B), (A, includes, C)."""
+    subject_phrase, object_phrase = [p.strip() for p in segment.split('->', 1)]
+    return [(subject_phrase, "includes", o.strip()) for o in object_phrase.split(',')]
+
+def concept_triples(doc):
+    """(subject, verb lemma, object) phrases for every verb in a parsed conceptMap text."""
+    triples = []
+    for sent in doc.sents:
+        for token in sent:
+            if token.pos_ == "VERB":
+                verb_token = token
+                subjects = []
+                objects = []
+                for child in verb_token.lefts:
+                    if child.dep_ in ("nsubj", "nsubjpass"):
+                        start_index = child.i 
+                        end_index = list(child.subtree)[-1].i + 1
+                        subject_span = doc[start_index:end_index] 
+                        subjects.append(subject_span.text.strip()) 
+
+                for child in verb_token.rights:
+                    if child.dep_ in ("dobj", "attr", "oprd"): 
+                        start_index = child.i 
+                        end_index = list(child.subtree)[-1].i + 1
+                        object_span = doc[start_index:end_index]
+                        objects.append(object_span.text.strip())
+
+                    elif child.dep_ == "prep": 
+                        pobj = [w for w in child.rights if w.dep_ == "pobj"]
+                        if pobj:
+                            pobj_token = pobj[0]
+                            start_index = pobj_token.i 
+                            end_index = list(pobj_token.subtree)[-1].i + 1
+                            object_span = doc[start_index:end_index]
+                            objects.append(object_span.text.strip())
+
+                    elif child.dep_ in ("advcl", "xcomp"): 
+                        inf_verb = child 
+                        inf_objects = []
+                        for inf_child in inf_verb.rights:
+                            if inf_child.dep_ in ("dobj", "attr"):
+                                start_index = inf_child.i 
+                                end_index = list(inf_child.subtree)[-1].i + 1
+                                object_span = doc[start_index:end_index]
+                                inf_objects.append(object_span.text.strip())
+
+                        if subjects and inf_objects:
+                            for s in subjects:
+                                for o in inf_objects:
+                                    triples.append((s, inf_verb.lemma_, o))
+                        continue
+
+                for s in subjects:
+                    for o in objects:
+                        triples.append((s, verb_token.lemma_, o))
+    return triples
+
+def concept_graph(triples):
+    """Nodes (one per label, in first-seen order) and deduplicated edges for conceptMap triples."""
+    nodes = []
+    edges = []
+    node_map = {}
+    unique_edges = set()
+
+    def get_node(label):
+        label = label.strip()
+        if not label:
+            return None
+        if label not in node_map:
+            node_id = f"N{len(nodes) + 1}"
+            node_map[label] = node_id
+            nodes.append({"id": node_id, "label": label})
+        return node_map[label]
+
+    for subj, relation, obj in triples:
+        s_id = get_node(subj)
+        o_id = get_node(obj)
+        if s_id and o_id and (s_id, o_id, relation) not in unique_edges:
+            unique_edges.add((s_id, o_id, relation))
+            edges.append({"from": s_id, "to": o_id, "label": relation})
+    return nodes, edges
+
+# diagram types that go through graph_simplify before serialization..
+SIMPLIFIED_KINDS = ("erDiagram", "conceptMap")
+
+def finish_diagram(kind, nodes, edges, max_nodes=None, max_edges=None):
+    """Simplifies oversized erDiagram / conceptMap graphs, applies the node / edge budget and serializes to Mermaid."""
+    simplified = None
+    rank = None
+    if kind in SIMPLIFIED_KINDS:
+        with stage("simplify"):
+            top_k = graph_simplify.GRAPH_TOP_K
+            if top_k:
+                max_nodes = top_k if max_nodes is None else min(max_nodes, top_k)
+            # small graphs are rendered as extracted..
+            nodes, edges, simplified = simplify_graph(nodes, edges, max_nodes)
+            if max_nodes is not None and len(nodes) > max_nodes and graph_simplify.GRAPH_RANK != "degree":
+                rank = node_ranks(nodes, edges, graph_simplify.GRAPH_RANK)
+    with stage("mermaid"):
+        nodes, edges, truncated = cap_graph(nodes, edges, max_nodes, max_edges, rank)
+        result = {"nodes": nodes, "edges": edges, "mermaid": render_mermaid(kind, nodes, edges)}
+    if simplified:
+        result["simplified"] = simplified
+    if truncated:
+        result["truncated"] = truncated
+    emit("diagram", nodes=len(nodes), edges=len(edges))
+    return result
+
+def placeholder_diagram(kind, node_id, label):
+    if kind not in MERMAID_HEADERS:
+        return {"nodes": [], "edges": [], "mermaid": f"{kind}\n  {node_id}[\"{label}\"]"}
+    return {"nodes": [], "edges": [], "mermaid": render_mermaid(kind, [{"id": node_id, "label": label}], [])}
+
+def generate_diagram(text, diagram_type="erDiagram", doc=None, max_nodes=MAX_NODES, max_edges=MAX_EDGES):
+    """
+    Cached front for build_diagram(). doc is an optional precomputed parse: of the whole
+    text for erDiagram, of the joined non-arrow segments for conceptMap.
+    """
+    return result_cache.cached(
+        "diagram", text, lambda: build_diagram(text, diagram_type, doc, max_nodes, max_edges),
+        **diagram_key_params(diagram_type, max_nodes, max_edges)
+    )
+
+def diagram_key_params(diagram_type, max_nodes=MAX_NODES, max_edges=MAX_EDGES):
+    """Everything besides the text that a cached diagram depends on."""
+    params = {"diagram_type": diagram_type, "max_nodes": max_nodes, "max_edges": max_edges}
+    if diagram_type in SIMPLIFIED_KINDS:
+        params["graph"] = graph_simplify.SETTINGS
+    return params
+
+def diagram_from_blocks(blocks, diagram_type="erDiagram", max_nodes=MAX_NODES, max_edges=MAX_EDGES):
+    """
+    build_diagram() over text blocks. erDiagram never holds the whole text; flowchart and
+    conceptMap need it all at once (blocks / ';' segments span lines), so they get it joined.
+    """
+    if diagram_type != "erDiagram":
+        return build_diagram("".join(blocks), diagram_type, max_nodes=max_nodes, max_edges=max_edges)
+
+    final_entities, final_relations = extract_entities_relations(blocks)
+    if not final_entities:
+        return placeholder_diagram("erDiagram", "E1", "No entities found")
+    nodes, edges = er_graph(final_entities, final_relations)
+    return finish_diagram("erDiagram", nodes, edges, max_nodes, max_edges)
+
+def analyze_blocks(blocks, diagram_type="erDiagram", n=5, scoring="frequency", length_norm=False,
+                   max_nodes=MAX_NODES, max_edges=MAX_EDGES):
+    """
+    analyze_text() over text blocks in one pass: each block is sentence-split for the summary
+    on its way into diagram_from_blocks(). No "text" in the result, that would be the whole file.
+    """
+    sentences = []
+
+    def tokenized():
+        for block in blocks:
+            with stage("tokenize"):
+                sentences.extend(sent_tokenize(block))
+            yield block
+
+    feed = tokenized()
+    diagram = diagram_from_blocks(feed, diagram_type, max_nodes, max_edges)
+    # the diagram may stop reading early, the summary still needs every sentence..
+    for _ in feed:
+        pass
+    return {"summary": summarize(None, n, sentences, scoring, length_norm), "diagram": diagram}
+
+def build_diagram(text, diagram_type="erDiagram", doc=None, max_nodes=None, max_edges=None):
     result = {"nodes": [], "edges": [], "mermaid": ""}
     
     if not text or not text.strip():
-         return {"nodes": [], "edges": [], "mermaid": f"{diagram_type}\n  N1[\"No text provided\"]"}
+         return placeholder_diagram(diagram_type, "N1", "No text provided")
 
     if diagram_type == "erDiagram":
         
-        final_entities, final_relations = extract_entities_relations(text)
+        final_entities, final_relations = extract_entities_relations(text, doc=doc)
 
         if not final_entities:
-            return {"nodes": [], "edges": [], "mermaid": "erDiagram\n  E1[\"No entities found\"]"}
-
-        entity_ids = {e: create_safe_id(e) for e in final_entities}
-
-        mermaid = "erDiagram\n"
-        for e in final_entities:
-            eid = entity_ids[e]
-            # Memaid syntax..
-            mermaid += f"  {eid} {{\n    string name \"{e}\"\n  }}\n"
-            
-        nodes = [{"id": entity_ids[label], "label": label} for label in final_entities]
-        edges = []
-            
-        for s, v, o in final_relations:
-            # rel. line..
-            mermaid += f"  {entity_ids[s]} ||--o{{ {entity_ids[o]} : \"{v.replace('_', ' ')}\"\n"
-            edges.append({"from": entity_ids[s], "to": entity_ids[o], "label": v})
-
-
-        return {
-            "nodes": nodes,
-            "edges": edges,
-            "mermaid": mermaid
-        }
+            return placeholder_diagram("erDiagram", "E1", "No entities found")
+
+        nodes, edges = er_graph(final_entities, final_relations)
+        return finish_diagram("erDiagram", nodes, edges, max_nodes, max_edges)
 
     elif diagram_type == "flowchart":
-        import re
-        raw_steps = [s.strip() for s in re.split(r'[\n;]+', text) if s.strip()]
-
-        nodes_data = []
-        edges = []
-        node_map = {}
-        node_counter = 1
-
-        def get_node(label, shape="[]"):
-            nonlocal node_counter
-            label = " ".join(label.split())  
-            if not label:
-                label = " "
-            if label not in node_map:
-                node_id = f"N{node_counter}"
-                node_counter += 1
-                node_map[label] = node_id
-                nodes_data.append((node_id, label, shape))
-            return node_map[label]
-
-        prev_node = None
-        pending_no = None  
-
-        start_id = get_node("Start", "()")
-        prev_node = start_id
-
-        for i, step in enumerate(raw_steps):
-            s = step.strip()
-
-            if "?" in s:
-                cond_part, after = s.split("?", 1)
-                decision_text = cond_part.strip().capitalize()
-                decision_id = get_node(f"If {decision_text}?", "{}")
-                if prev_node:
-                    edges.append((prev_node, decision_id, ""))
-                prev_node = decision_id
-
-                yes_match = re.search(r'if yes (.+?)(?:$|;|,)', after, re.I)
-                if yes_match:
-                    yes_text = yes_match.group(1).strip().capitalize()
-                    yes_id = get_node(yes_text)
-                    edges.append((decision_id, yes_id, "Yes"))
-                    prev_node = yes_id
-                pending_no = decision_id
-                continue
-
-            m_arrow = re.match(r'if\s+(.+?)\s*(?:->|then)\s*(.+?)\s*(?:else\s*(.+))?$', s, re.I)
-            if m_arrow:
-                cond_text = m_arrow.group(1).strip().capitalize()
-                yes_text = m_arrow.group(2).strip().capitalize()
-                no_text = m_arrow.group(3).strip().capitalize() if m_arrow.group(3) else None
-
-                decision_id = get_node(f"If {cond_text}?", "{}")  
-                yes_id = get_node(yes_text)
-                edges.append((prev_node, decision_id, ""))
-                edges.append((decision_id, yes_id, "Yes"))
-
-                if no_text:
-                    no_id = get_node(no_text)
-                    edges.append((decision_id, no_id, "No"))
-                else:
-                    pending_no = decision_id  
-
-                prev_node = yes_id
-                continue
-
-            m_inline = re.match(r'if\s+(.+?)\s+(print .+?)\s+else\s+(print .+)', s, re.I)
-            if m_inline:
-                cond_text = m_inline.group(1).strip().capitalize()
-                yes_text = m_inline.group(2).strip().capitalize()
-                no_text = m_inline.group(3).strip().capitalize()
-
-                decision_id = get_node(f"If {cond_text}?", "{}")
-                yes_id = get_node(yes_text)
-                no_id = get_node(no_text)
-
-                if prev_node:
-                    edges.append((prev_node, decision_id, ""))
-                edges.append((decision_id, yes_id, "Yes"))
-                edges.append((decision_id, no_id, "No"))
-
-                prev_node = yes_id
-                continue
-
-            m_else = re.match(r'^(?:else|otherwise)\s*(?:->|:)?\s*(.+)$', s, re.I)
-            if m_else and pending_no:
-                no_text = m_else.group(1).strip().capitalize()
-                no_id = get_node(no_text)
-                edges.append((pending_no, no_id, "No"))
-                pending_no = None
-                continue
-            
-            lower = s.lower()
-            if any(w in lower for w in ["start", "begin"]):
-                cur_id = start_id
-            elif any(w in lower for w in ["end", "stop", "finish", "terminate"]):
-                cur_id = get_node("End", "()")
-            else:
-                cur_id = get_node(s.capitalize(), "[]")
-
-            if prev_node and prev_node != cur_id:
-                edges.append((prev_node, cur_id, ""))
-            prev_node = cur_id
-
-        if not any("end" in n[1].lower() for n in nodes_data):
-            end_id = get_node("End", "()")
-            if prev_node:
-                edges.append((prev_node, end_id, ""))
-
-        mermaid = "flowchart TD\n"
-        for nid, label, shape in nodes_data:
-            safe_lbl = label.replace('"', "'")
-            if shape == "()":
-                mermaid += f"  {nid}(\"{safe_lbl}\")\n"
-            elif shape == "{}":
-                mermaid += f"  {nid}{{\"{safe_lbl}\"}}\n"
-            else:
-                mermaid += f"  {nid}[\"{safe_lbl}\"]\n"
+        with stage("flowchart_compile"):
+            nodes, edges = compile_flowchart(text)
+        return finish_diagram("flowchart", nodes, edges, max_nodes, max_edges)
 
-        for src, dst, lbl in edges:
-            if src and dst:
-                arrow = f" -->|{lbl}| " if lbl else " --> "
-                mermaid += f"  {src}{arrow}{dst}\n"
+    elif diagram_type == "conceptMap":
+        arrow_segments, nlp_segments = split_concept_segments(text)
+        triples = [t for segment in arrow_segments for t in arrow_triples(segment)]
 
-        return {
-            "nodes": [{"id": nid, "label": lbl} for nid, lbl, _ in nodes_data],
-            "edges": [{"from": s, "to": d, "label": lbl} for s, d, lbl in edges if d],
-            "mermaid": mermaid
-        }
+        nlp_text = ". ".join(nlp_segments)
+        if nlp_text:
+            # a doc passed in (batch / analyze) is already the parse of nlp_text..
+            if doc is None:
+                doc = parse_text(nlp_text, "conceptMap")
+            triples.extend(concept_triples(doc))
 
-    elif diagram_type == "conceptMap":
-        nodes = []
-        edges = []
-        node_map = {}
-        node_counter = 1
-        unique_edges = set() 
-
-        def get_node(label):
-            nonlocal node_counter
-            label = label.strip()
-            if not label:
-                return None 
-            if label not in node_map:
-                node_id = f"N{node_counter}"
-                node_counter += 1
-                node_map[label] = node_id
-                nodes.append({"id": node_id, "label": label})
-            return node_map[label]
-
-        segments = [s.strip() for s in text.split(';') if s.strip()]
-
-        nlp_segments = [] 
-
-        for segment in segments:
+        nodes, edges = concept_graph(triples)
+        return finish_diagram("conceptMap", nodes, edges, max_nodes, max_edges)
+    return result
+
+
+# summary + diagram from one pass over the text..
+def analyze_text(text, diagram_type="erDiagram", n=5, scoring="frequency", length_norm=False,
+                 max_nodes=MAX_NODES, max_edges=MAX_EDGES):
+    """
+    Computes summary and diagram together; for erDiagram they share one spaCy Doc
+    (and its sentences) instead of parsing the text twice. Takes the same summary options
+    and diagram caps as generate_summary() / generate_diagram().
+    """
+    doc = None
+    # no point parsing if the diagram is already cached..
+    needs_doc = not result_cache.contains("diagram", text, **diagram_key_params(diagram_type, max_nodes, max_edges))
+    # above CHUNK_CHARS the diagram is built chunk by chunk, nothing whole-text to share..
+    fits_one_doc = text and text.strip() and len(text) <= CHUNK_CHARS
+    # without a Doc the summary splits with NLTK itself, same cache entry as a plain summary request..
+    sentences = None
+    if fits_one_doc and diagram_type == "erDiagram" and needs_doc:
+        doc = parse_text(text, "erDiagram")
+        sentences = [s.text.strip() for s in doc.sents if s.text.strip()]
+
+    return {
+        "text": text,
+        "summary": generate_summary(text, n, sentences=sentences, scoring=scoring, length_norm=length_norm),
+        "diagram": generate_diagram(text, diagram_type, doc=doc, max_nodes=max_nodes, max_edges=max_edges),
+    }
+
+
+# many documents at once, spaCy work goes through nlp.pipe..
+def generate_diagrams_batch(texts, diagram_type="erDiagram", batch_size=64, n_process=1):
+    """
+    Yields one diagram per text, in input order. texts can be any (lazy) iterable.
+    n_process > 1 starts spaCy worker processes; under spawn / forkserver they re-import the
+    caller's main module, so only pass it from behind an `if __name__ == "__main__"` guard.
+    """
+    import multiprocessing
+    if multiprocessing.parent_process() is not None:
+        # already a pool worker (e.g. re-imported by spawn), never start a nested pool..
+        n_process = 1
+    if diagram_type not in ("erDiagram", "conceptMap"):
+        for text in texts:
+            yield generate_diagram(text, diagram_type)
+        return
+
+    def pipe_inputs():
+        for text in texts:
+            nlp_input = ""
+            if text and text.strip() and not result_cache.contains("diagram", text, **diagram_key_params(diagram_type)):
+                if diagram_type == "erDiagram":
+                    # oversized documents are left to the chunked path in build_diagram..
+                    nlp_input = text if len(text) <= CHUNK_CHARS else ""
+                else:
+                    nlp_input = ". ".join(split_concept_segments(text)[1])
+            yield nlp_input, (text, bool(nlp_input))
+
+    with select_pipes_for(diagram_type):
+        docs = get_nlp().pipe(pipe_inputs(), as_tuples=True, batch_size=batch_size, n_process=n_process)
+        for doc, (text, parsed) in timed_iter("spacy_parse", docs):
+            yield generate_diagram(text, diagram_type, doc=doc if parsed else None)
+
+
+# incremental updates for live-edited text..
+# the result carries a "state" with the text, its segments and what each one produced;
+# the next call diffs the segment lists and only re-parses the segments that changed.
+
+def apply_edits(text, edits):
+    """edits: {"start", "end", "text"} or a list of them, applied in order to text."""
+    if isinstance(edits, dict):
+        edits = [edits]
+    for edit in edits:
+        text = text[:edit["start"]] + edit.get("text", "") + text[edit["end"]:]
+    return text
+
+def diff_units(old_units, segments):
+    """(prefix, suffix) counts of segments unchanged at the start / end of the text."""
+    limit = min(len(old_units), len(segments))
+    prefix = 0
+    while prefix < limit and old_units[prefix][0] == segments[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_units[-1 - suffix][0] == segments[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+def stabilize_ids(nodes, edges, ids, next_id):
+    """Re-labels node ids so labels seen in the previous result keep their old id."""
+    remap = {}
+    new_ids = {}
+    for node in nodes:
+        stable = ids.get(node["label"])
+        if stable is None:
+            stable = f"N{next_id}"
+            next_id += 1
+        remap[node["id"]] = stable
+        new_ids[node["label"]] = stable
+    nodes = [dict(node, id=remap[node["id"]]) for node in nodes]
+    edges = [dict(edge, **{"from": remap[edge["from"]], "to": remap[edge["to"]]}) for edge in edges]
+    return nodes, edges, new_ids, next_id
+
+def parse_units(segments, diagram_type):
+    """What each changed segment contributes: conceptMap triples, or raw erDiagram entities / relations."""
+    if diagram_type == "conceptMap":
+        units = [None] * len(segments)
+        nlp_positions = []
+        for i, segment in enumerate(segments):
             if '->' in segment:
-                try:
-                    subject_phrase, object_phrase = [p.strip() for p in segment.split('->', 1)]
-                    
-                    relation = "includes" 
-                    
-                    objects_list = [o.strip() for o in object_phrase.split(',')]
-                    
-                    s_id = get_node(subject_phrase)
-
-                    for obj in objects_list:
-                        if obj:
-                            o_id = get_node(obj)
-                            if s_id and o_id:
-                                edge_tuple = (s_id, o_id, relation)
-                                if edge_tuple not in unique_edges:
-                                    unique_edges.add(edge_tuple)
-                                    edges.append({"from": s_id, "to": o_id, "label": relation})
-                except ValueError:
-                    nlp_segments.append(segment)
+                units[i] = [segment, arrow_triples(segment)]
             else:
-                nlp_segments.append(segment)
-                
-        nlp_text = ". ".join(nlp_segments)
-        if not nlp_text:
-            pass
+                nlp_positions.append(i)
+        if nlp_positions:
+            with select_pipes_for("conceptMap"):
+                docs = timed_iter("spacy_parse", get_nlp().pipe(segments[i] for i in nlp_positions))
+                for i, doc in zip(nlp_positions, docs):
+                    units[i] = [segments[i], concept_triples(doc)]
+        return units
+
+    units = []
+    with select_pipes_for("erDiagram"):
+        for segment, doc in zip(segments, timed_iter("spacy_parse", get_nlp().pipe(segments))):
+            raw_entities = set()
+            raw_relations = set()
+            with stage("entities"):
+                collect_entities_relations(doc, raw_entities, raw_relations)
+            units.append([segment, sorted(raw_entities), sorted(raw_relations)])
+    return units
+
+def update_diagram(text=None, diagram_type="erDiagram", previous=None, edits=None,
+                   max_nodes=MAX_NODES, max_edges=MAX_EDGES):
+    """
+    Incremental generate_diagram for live editing. Pass the previous update_diagram result
+    and either the new text or edits against the previous text; segments (';' / newline
+    steps for flowchart, ';' segments for conceptMap, sentences for erDiagram) that didn't
+    change are reused, and node ids stay the same for labels that were already there.
+    Flowcharts are the exception: block structure spans steps, so the graph is always rebuilt
+    from the whole text and only the step matching is reused; "reparsed" counts the steps
+    that had to be matched again.
+    """
+    if diagram_type not in MERMAID_HEADERS:
+        return {"error": "Invalid diagram type"}
+    state = (previous or {}).get("state") or {}
+    if state.get("diagram_type") != diagram_type:
+        state = {}
+    if text is None:
+        text = apply_edits(state.get("text", ""), edits or [])
+
+    if not text.strip():
+        return placeholder_diagram(diagram_type, "N1", "No text provided")
+
+    old_units = state.get("units", [])
+    reparsed = 0
+    if diagram_type == "flowchart":
+        # full rebuild; steps go through the memoized flowchart.parse_step, only edited ones miss..
+        misses = parse_step.cache_info().misses
+        with stage("flowchart_compile"):
+            nodes, edges = compile_flowchart(text)
+        reparsed = parse_step.cache_info().misses - misses
+        units = []
+    else:
+        if diagram_type == "conceptMap":
+            segments = [s.strip() for s in text.split(';') if s.strip()]
         else:
-            doc = nlp(nlp_text)
-
-            for sent in doc.sents:
-                for token in sent:
-                    if token.pos_ == "VERB":
-                        verb_token = token
-                        subjects = []
-                        objects = []
-                        for child in verb_token.lefts:
-                            if child.dep_ in ("nsubj", "nsubjpass"):
-                                start_index = child.i 
-                                end_index = list(child.subtree)[-1].i + 1
-                                subject_span = doc[start_index:end_index] 
-                                subjects.append(subject_span.text.strip()) 
-                        
-                        for child in verb_token.rights:
-                            if child.dep_ in ("dobj", "attr", "oprd"): 
-                                start_index = child.i 
-                                end_index = list(child.subtree)[-1].i + 1
-                                object_span = doc[start_index:end_index]
-                                objects.append(object_span.text.strip())
-                            
-                            elif child.dep_ == "prep": 
-                                pobj = [w for w in child.rights if w.dep_ == "pobj"]
-                                if pobj:
-                                    pobj_token = pobj[0]
-                                    start_index = pobj_token.i 
-                                    end_index = list(pobj_token.subtree)[-1].i + 1
-                                    object_span = doc[start_index:end_index]
-                                    objects.append(object_span.text.strip())
-                            
-                            elif child.dep_ in ("advcl", "xcomp"): 
-                                inf_verb = child 
-                                inf_objects = []
-                                for inf_child in inf_verb.rights:
-                                    if inf_child.dep_ in ("dobj", "attr"):
-                                        start_index = inf_child.i 
-                                        end_index = list(inf_child.subtree)[-1].i + 1
-                                        object_span = doc[start_index:end_index]
-                                        inf_objects.append(object_span.text.strip())
-
-                                if subjects and inf_objects:
-                                    for s in subjects:
-                                        for o in inf_objects:
-                                            s_id = get_node(s)
-                                            o_id = get_node(o)
-                                            relation_lemma = inf_verb.lemma_ 
-                                            edge_tuple = (s_id, o_id, relation_lemma)
-                                            if edge_tuple not in unique_edges:
-                                                unique_edges.add(edge_tuple)
-                                                edges.append({"from": s_id, "to": o_id, "label": relation_lemma})
-                                continue
-                        
-                        for s in subjects:
-                            for o in objects:
-                                s_id = get_node(s)
-                                o_id = get_node(o)
-                                relation_lemma = verb_token.lemma_
-                                edge_tuple = (s_id, o_id, relation_lemma)
-                                if edge_tuple not in unique_edges:
-                                    unique_edges.add(edge_tuple)
-                                    edges.append({"from": s_id, "to": o_id, "label": relation_lemma})
-
-
-        mermaid = "graph TD\n"
-        for node in nodes:
-            safe_label = node["label"].replace('"', "'")
-            mermaid += f'  {node["id"]}[{safe_label}]\n'
-        for edge in edges:
-            lbl = edge.get("label", "")
-            arrow = f" -->|{lbl}| " if lbl else " --> "
-            mermaid += f'  {edge["from"]}{arrow}{edge["to"]}\n'
-
-        return {
-            "nodes": nodes,
-            "edges": edges,
-            "mermaid": mermaid
-        }
-    return result
\ No newline at end of file
+            # regex split instead of punkt, so finding the edited sentences stays cheap..
+            segments = [s.strip() for s in SENTENCE_END_RE.split(text) if s.strip()]
+        prefix, suffix = diff_units(old_units, segments)
+        changed = segments[prefix:len(segments) - suffix]
+        reparsed = len(changed)
+        units = old_units[:prefix] + parse_units(changed, diagram_type) + old_units[len(old_units) - suffix:]
+
+        if diagram_type == "conceptMap":
+            # same order as build_diagram: "->" segments first, then the spaCy ones..
+            triples = [tuple(t) for unit in units if '->' in unit[0] for t in unit[1]]
+            triples += [tuple(t) for unit in units if '->' not in unit[0] for t in unit[1]]
+            nodes, edges = concept_graph(triples)
+        else:
+            raw_entities = {e for unit in units for e in unit[1]}
+            raw_relations = {tuple(r) for unit in units for r in unit[2]}
+            final_entities, final_relations = assemble_entities_relations(raw_entities, raw_relations)
+            nodes, edges = er_graph(final_entities, final_relations)
+
+    ids = state.get("ids", {})
+    next_id = state.get("next_id", 1)
+    if diagram_type != "erDiagram":
+        nodes, edges, ids, next_id = stabilize_ids(nodes, edges, ids, next_id)
+
+    if nodes:
+        result = finish_diagram(diagram_type, nodes, edges, max_nodes, max_edges)
+    else:
+        result = placeholder_diagram(diagram_type, "E1", "No entities found")
+    result["reparsed"] = reparsed
+    result["state"] = {
+        "diagram_type": diagram_type,
+        "text": text,
+        "units": units,
+        "ids": ids,
+        "next_id": next_id,
+    }
+    return result
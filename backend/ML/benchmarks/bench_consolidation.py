@@ -0,0 +1,84 @@
+"""
+Scaling of consolidate_entities vs the old pairwise containment scan.
+
+    python benchmarks/bench_consolidation.py [--sizes 250,500,1000,2000,4000]
+
+Doubling n should roughly double the indexed version's time and quadruple the legacy one.
+"""
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ML_module import consolidate_entities, normalize_entity
+
+WORDS = [
+    "data", "model", "cache", "server", "request", "student", "course", "teacher", "graph",
+    "node", "edge", "memory", "page", "document", "summary", "diagram", "entity", "relation",
+    "process", "thread", "queue", "worker", "index", "token", "sentence", "vector", "matrix",
+]
+
+
+def legacy_consolidate_entities(entities):
+    """The previous O(n^2) substring scan, kept here only as the baseline."""
+    if not entities:
+        return {}
+    consolidation_map = {}
+    sorted_entities = sorted(list(set(entities)), key=len, reverse=True)
+    for entity in sorted_entities:
+        norm = normalize_entity(entity)
+        if norm and norm not in consolidation_map:
+            consolidation_map[norm] = entity
+    final_map = {}
+    for entity in entities:
+        norm = normalize_entity(entity)
+        best_match = consolidation_map.get(norm, entity)
+        for n_key, master in consolidation_map.items():
+            if norm != n_key and (norm in n_key or n_key in norm):
+                if len(master) > len(best_match) or best_match == entity:
+                    best_match = master
+        final_map[entity] = best_match
+    return final_map
+
+
+def make_entities(n, seed=0):
+    """Noun-chunk-like names: 1-4 words, some with articles, a few acronyms."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        words = [rng.choice(WORDS) + str(rng.randint(0, n // 10)) for _ in range(rng.randint(1, 4))]
+        name = " ".join(words)
+        if rng.random() < 0.2:
+            name = "the " + name
+        elif rng.random() < 0.05:
+            name = "".join(w[0] for w in words).upper()
+        names.add(name)
+    return list(names)
+
+
+def timed(fn, entities):
+    start = time.perf_counter()
+    fn(entities)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [250, 500, 1000, 2000, 4000]
+    if "--sizes" in sys.argv:
+        sizes = [int(x) for x in sys.argv[sys.argv.index("--sizes") + 1].split(",")]
+
+    rows = []
+    for n in sizes:
+        entities = make_entities(n)
+        rows.append({
+            "n": n,
+            "indexed_s": round(timed(consolidate_entities, entities), 5),
+            "legacy_s": round(timed(legacy_consolidate_entities, entities), 5),
+        })
+        print(json.dumps(rows[-1]))
+
+
+if __name__ == "__main__":
+    main()
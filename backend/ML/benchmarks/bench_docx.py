@@ -0,0 +1,118 @@
+"""
+DOCX extraction: streaming iterparse reader vs. python-docx.
+
+    python benchmarks/bench_docx.py [--sizes 1000,10000,50000]
+
+Writes synthetic .docx files (body paragraphs, a 3-column table every 20 paragraphs and
+an occasional text box) and times extractors.iter_docx_paragraphs on each, plus
+python-docx's Document().paragraphs when python-docx is installed.
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import zipfile
+import resource
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from extractors import iter_docx_paragraphs
+from corpus import prose
+
+try:
+    import docx
+except ImportError:
+    docx = None
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+DOC_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"><w:body>'
+)
+DOC_CLOSE = "<w:sectPr/></w:body></w:document>"
+
+
+def paragraph(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def text_box(text):
+    # same text twice, like Word writes it (DrawingML choice + VML fallback)..
+    box = f"<w:txbxContent>{paragraph(text)}</w:txbxContent>"
+    return (
+        f"<w:p><w:r><mc:AlternateContent><mc:Choice>{box}</mc:Choice>"
+        f"<mc:Fallback>{box}</mc:Fallback></mc:AlternateContent></w:r></w:p>"
+    )
+
+
+def write_docx(path, n_paragraphs, seed=0):
+    rng = random.Random(seed)
+    sentences = prose(n_paragraphs * 120, seed).split(". ")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", RELS)
+        with archive.open("word/document.xml", "w") as xml:
+            xml.write(DOC_OPEN.encode())
+            for i in range(n_paragraphs):
+                parts = [paragraph(rng.choice(sentences))]
+                if i % 20 == 19:
+                    cells = "".join(f"<w:tc>{paragraph(f'cell {i}.{c}')}</w:tc>" for c in range(3))
+                    parts.append(f"<w:tbl><w:tr>{cells}</w:tr></w:tbl>")
+                if i % 100 == 99:
+                    parts.append(text_box(f"text box {i}"))
+                xml.write("".join(parts).encode())
+            xml.write(DOC_CLOSE.encode())
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, round(time.perf_counter() - start, 4)
+
+
+def main():
+    sizes = [1000, 10000, 50000]
+    if "--sizes" in sys.argv:
+        sizes = [int(x) for x in sys.argv[sys.argv.index("--sizes") + 1].split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"bench_{n}.docx")
+            write_docx(path, n)
+            paragraphs, seconds = timed(lambda: list(iter_docx_paragraphs(path)))
+            record = {
+                "paragraphs": n,
+                "bytes": os.path.getsize(path),
+                "iterparse_s": seconds,
+                "iterparse_out": len(paragraphs),
+            }
+            if docx is not None:
+                legacy, seconds = timed(lambda: [p.text for p in docx.Document(path).paragraphs])
+                record["python_docx_s"] = seconds
+                record["python_docx_out"] = len(legacy)
+            # ru_maxrss is KB on Linux..
+            record["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+            print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
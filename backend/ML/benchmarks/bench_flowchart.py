@@ -0,0 +1,71 @@
+"""
+Throughput of the flowchart compiler on synthetic pseudo-code.
+
+    python benchmarks/bench_flowchart.py [--sizes 1000,5000,10000,25000,50000]
+
+Lines per second should stay flat as the input grows (linear total time).
+"""
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from flowchart import compile_flowchart
+
+
+def make_pseudo_code(n_lines, seed=0):
+    """Steps, one-liner ifs, nested if / elif / else blocks and while / repeat loops."""
+    rng = random.Random(seed)
+    lines = ["start"]
+    depth = []
+    i = 0
+    while len(lines) < n_lines:
+        i += 1
+        roll = rng.random()
+        if roll < 0.08 and len(depth) < 6:
+            kind = rng.choice(["if", "while", "repeat"])
+            lines.append({"if": f"if x{i} > {i}:", "while": f"while y{i} < {i}:", "repeat": "repeat"}[kind])
+            depth.append(kind)
+        elif roll < 0.14 and depth:
+            kind = depth.pop()
+            if kind == "if":
+                lines.append("else:")
+                lines.append(f"handle case {i}")
+                lines.append("end if")
+            elif kind == "while":
+                lines.append("end while")
+            else:
+                lines.append(f"until done {i}")
+        elif roll < 0.2:
+            lines.append(f"if flag{i} -> set a{i} else set b{i}")
+        elif roll < 0.23:
+            lines.append(f"ready {i}? if yes go {i}")
+        else:
+            lines.append(f"compute value {i}")
+    lines.append("end")
+    return "\n".join(lines)
+
+
+def main():
+    sizes = [1000, 5000, 10000, 25000, 50000]
+    if "--sizes" in sys.argv:
+        sizes = [int(x) for x in sys.argv[sys.argv.index("--sizes") + 1].split(",")]
+
+    for n in sizes:
+        text = make_pseudo_code(n)
+        start = time.perf_counter()
+        nodes, edges = compile_flowchart(text)
+        elapsed = time.perf_counter() - start
+        print(json.dumps({
+            "lines": n,
+            "nodes": len(nodes),
+            "edges": len(edges),
+            "seconds": round(elapsed, 4),
+            "lines_per_s": int(n / elapsed) if elapsed else None,
+        }))
+
+
+if __name__ == "__main__":
+    main()
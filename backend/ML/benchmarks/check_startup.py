@@ -0,0 +1,69 @@
+"""
+Startup regression check for processor.py.
+
+    python benchmarks/check_startup.py [--budget-ms 150] [--repeat 3]
+
+Runs `python -X importtime processor.py parse -t x` and fails (exit 1) if
+  - the import time (sum of top-level cumulative times, best of --repeat runs) is over
+    the budget (--budget-ms, or VB_IMPORT_BUDGET_MS, default 150), or
+  - any heavy dependency (spaCy, NLTK, numpy, pdfplumber, python-docx) gets imported at all;
+    parse of a plain string needs none of them.
+The slowest imports are printed either way.
+"""
+import os
+import sys
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSOR = os.path.join(os.path.dirname(BENCH_DIR), "processor.py")
+HEAVY = ("spacy", "nltk", "numpy", "pdfplumber", "docx", "thinc")
+
+
+def option(name, default):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def measure():
+    """Returns ({module: cumulative_us} for top-level imports, set of every imported module)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", PROCESSOR, "parse", "-t", "x"],
+        capture_output=True, text=True, check=True,
+    )
+    top_level = {}
+    modules = set()
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, modules
+
+
+def main():
+    budget_ms = float(option("--budget-ms", os.environ.get("VB_IMPORT_BUDGET_MS", "150")))
+    runs = [measure() for _ in range(int(option("--repeat", "3")))]
+    top_level, modules = min(runs, key=lambda run: sum(run[0].values()))
+    total_ms = sum(top_level.values()) / 1000
+
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"{us / 1000:8.1f} ms  {name}")
+    print(f"{total_ms:8.1f} ms  total (budget {budget_ms:g} ms)")
+
+    failures = []
+    heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY)
+    if heavy:
+        failures.append("heavy modules imported: " + ", ".join(heavy[:10]))
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms is over the {budget_ms:g} ms budget")
+    for failure in failures:
+        print("FAIL: " + failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Synthetic benchmark corpus: prose, pseudo-code steps and "A -> B, C" concept lists.
+
+    python benchmarks/corpus.py <out_dir> [--sizes 1KB,100KB,1MB,10MB]
+
+Writes <kind>_<size>.txt files; the same seed always gives the same text.
+"""
+import os
+import sys
+import random
+
+KINDS = ("prose", "pseudo", "concepts")
+DEFAULT_SIZES = ("1KB", "10KB", "100KB", "1MB")
+
+SUBJECTS = [
+    "The student", "A teacher", "The server", "The database", "Each worker", "The cache",
+    "The compiler", "A librarian", "The university", "The scheduler", "Our team", "The parser",
+]
+VERBS = ["stores", "reads", "creates", "updates", "teaches", "sends", "indexes", "reviews", "owns"]
+OBJECTS = [
+    "the records", "a new course", "the request queue", "every page", "the summary", "a diagram",
+    "the lecture notes", "an invoice", "the final report", "the index", "the user profile",
+]
+PREPS = ["for the department", "in the morning", "with the client", "by the deadline", "on the server"]
+CONCEPTS = [
+    "Machine Learning", "Supervised Learning", "Neural Network", "Dataset", "Feature", "Label",
+    "Operating System", "Process", "Thread", "Memory", "Scheduler", "File System", "Database",
+    "Table", "Index", "Query", "Transaction", "Network", "Protocol", "Packet", "Router",
+]
+
+
+def parse_size(size):
+    """'1KB' / '10MB' / '512' -> bytes."""
+    size = size.strip().upper()
+    for suffix, factor in (("KB", 1024), ("MB", 1024 * 1024), ("B", 1)):
+        if size.endswith(suffix):
+            return int(float(size[: -len(suffix)]) * factor)
+    return int(size)
+
+
+def _fill(make_piece, n_bytes, sep, seed):
+    rng = random.Random(seed)
+    pieces = []
+    total = 0
+    while total < n_bytes:
+        piece = make_piece(rng, len(pieces))
+        pieces.append(piece)
+        total += len(piece) + len(sep)
+    return sep.join(pieces)
+
+
+def prose(n_bytes, seed=0):
+    """Subject-verb-object sentences grouped into paragraphs, the erDiagram / summary input."""
+    def sentence(rng, i):
+        s = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(PREPS)}."
+        return s + ("\n" if i % 6 == 5 else "")
+    return _fill(sentence, n_bytes, " ", seed)
+
+
+def pseudo_code(n_bytes, seed=0):
+    """Flowchart input: plain steps, one-liner ifs and small if / while blocks."""
+    def step(rng, i):
+        roll = rng.random()
+        if roll < 0.1:
+            return f"if x{i} > {i}:\nupdate total {i}\nelse:\nlog skip {i}\nend if"
+        if roll < 0.15:
+            return f"while queue {i} not empty:\nprocess item {i}\nend while"
+        if roll < 0.25:
+            return f"if flag{i} -> send mail {i} else retry {i}"
+        return f"compute value {i}"
+    return "start\n" + _fill(step, n_bytes, "\n", seed) + "\nend"
+
+
+def concept_list(n_bytes, seed=0):
+    """conceptMap input: "A -> B, C" segments separated by ';'."""
+    def segment(rng, i):
+        objects = ", ".join(f"{c} {i % 50}" for c in rng.sample(CONCEPTS, 3))
+        return f"{rng.choice(CONCEPTS)} {i % 50} -> {objects}"
+    return _fill(segment, n_bytes, "; ", seed)
+
+
+GENERATORS = {"prose": prose, "pseudo": pseudo_code, "concepts": concept_list}
+
+
+def make_text(kind, size, seed=0):
+    return GENERATORS[kind](parse_size(size), seed)
+
+
+def write_corpus(out_dir, sizes=DEFAULT_SIZES, kinds=KINDS):
+    """Writes every kind x size into out_dir and returns {(kind, size): path}."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for kind in kinds:
+        for size in sizes:
+            path = os.path.join(out_dir, f"{kind}_{size}.txt")
+            if not os.path.exists(path):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(make_text(kind, size))
+            paths[(kind, size)] = path
+    return paths
+
+
+if __name__ == "__main__":
+    sizes = DEFAULT_SIZES
+    if "--sizes" in sys.argv:
+        sizes = sys.argv[sys.argv.index("--sizes") + 1].split(",")
+    for path in write_corpus(sys.argv[1], sizes).values():
+        print(path)
@@ -0,0 +1,189 @@
+"""
+Benchmark harness for the ML pipeline.
+
+    python benchmarks/run_benchmarks.py [--sizes 1KB,10KB,100KB,1MB] [--kinds prose,pseudo,concepts]
+                                        [--out results.json] [--compare old_results.json]
+    python benchmarks/run_benchmarks.py --startup [--repeat 5] [--out startup.json]
+
+Every (kind, size) case runs in its own python process, so peak RSS belongs to that case
+alone. Stages per case: import of ML_module, parse_file, then
+  prose    : model_load, summary, entities (extract_entities_relations), diagram_erDiagram
+  pseudo   : diagram_flowchart
+  concepts : diagram_conceptMap
+--startup compares `processor.py diagram -t ...` cold runs with jobs sent to a warm
+`processor.py serve` worker. The result cache is switched off for all runs.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+from corpus import DEFAULT_SIZES, KINDS, make_text, write_corpus
+
+CORPUS_DIR = os.path.join(BENCH_DIR, "corpus")
+DIAGRAM_TYPES = {"prose": "erDiagram", "pseudo": "flowchart", "concepts": "conceptMap"}
+
+
+def bench_env():
+    env = dict(os.environ)
+    env["VB_CACHE_SIZE"] = "0"
+    env.pop("VB_CACHE_DIR", None)
+    # every stage parses for itself, not a doc_load of an earlier stage's parse..
+    env["VB_DOC_CACHE"] = "0"
+    return env
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux..
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_case(kind, path):
+    """Child side: times each stage of one case and returns the record."""
+    stages = {}
+
+    def stage(name, fn, *args):
+        start = time.perf_counter()
+        out = fn(*args)
+        stages[name] = {"seconds": round(time.perf_counter() - start, 5), "rss_mb": peak_rss_mb()}
+        return out
+
+    sys.path.insert(0, ML_DIR)
+    ML_module = stage("import", __import__, "ML_module")
+    text = stage("parse", ML_module.parse_file, path)
+    if kind == "prose":
+        stage("model_load", ML_module.get_nlp)
+        stage("summary", ML_module.generate_summary, text)
+        stage("entities", ML_module.extract_entities_relations, text)
+    stage(f"diagram_{DIAGRAM_TYPES[kind]}", ML_module.generate_diagram, text, DIAGRAM_TYPES[kind])
+
+    return {
+        "kind": kind,
+        "bytes": os.path.getsize(path),
+        "wall_s": round(sum(s["seconds"] for s in stages.values()), 5),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+
+
+def run_cases(kinds, sizes):
+    paths = write_corpus(CORPUS_DIR, sizes, kinds)
+    results = {}
+    for (kind, size), path in paths.items():
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--case", kind, path],
+            capture_output=True, text=True, env=bench_env(),
+        )
+        if proc.returncode != 0:
+            results[f"{kind}_{size}"] = {"error": proc.stderr.strip().splitlines()[-1:]}
+        else:
+            results[f"{kind}_{size}"] = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{kind}_{size}: {json.dumps(results[f'{kind}_{size}'].get('wall_s'))}s", file=sys.stderr)
+    return results
+
+
+def run_startup(repeat):
+    """Cold CLI calls vs. a warm serve worker, per diagram type, on small inputs."""
+    processor = os.path.join(ML_DIR, "processor.py")
+    inputs = {kind: make_text(kind, "1KB") for kind in KINDS}
+    results = {}
+
+    for kind, text in inputs.items():
+        diagram_type = DIAGRAM_TYPES[kind]
+        cold = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, processor, "diagram", "-t", text, diagram_type],
+                capture_output=True, env=bench_env(), check=True,
+            )
+            cold.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        worker = subprocess.Popen(
+            [sys.executable, processor, "serve"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=bench_env(),
+        )
+        warm = []
+        try:
+            for i in range(repeat + 1):
+                job_start = time.perf_counter()
+                worker.stdin.write(json.dumps({"id": i, "mode": "diagram", "text": text, "diagram_type": diagram_type}) + "\n")
+                worker.stdin.flush()
+                worker.stdout.readline()
+                if i == 0:
+                    # first answer includes interpreter start + model load..
+                    first = time.perf_counter() - start
+                else:
+                    warm.append(time.perf_counter() - job_start)
+        finally:
+            worker.stdin.close()
+            worker.wait()
+
+        results[diagram_type] = {
+            "cold_median_s": round(statistics.median(cold), 4),
+            "warm_first_s": round(first, 4),
+            "warm_median_s": round(statistics.median(warm), 4),
+        }
+    return results
+
+
+def compare(results, old_path):
+    """Prints new / old time ratios per case and stage (< 1 means faster)."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f).get("cases", {})
+    for case, record in sorted(results.items()):
+        before = old.get(case)
+        if not before or "stages" not in record or "stages" not in before:
+            continue
+        parts = []
+        for name, stage in record["stages"].items():
+            prev = before["stages"].get(name)
+            if prev and prev["seconds"]:
+                parts.append(f"{name} x{stage['seconds'] / prev['seconds']:.2f}")
+        print(f"{case}: " + ", ".join(parts))
+
+
+def option(name, default=None):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def main():
+    if "--case" in sys.argv:
+        i = sys.argv.index("--case")
+        print(json.dumps(run_case(sys.argv[i + 1], sys.argv[i + 2])))
+        return
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if "--startup" in sys.argv:
+        report["startup"] = run_startup(int(option("--repeat", "5")))
+    else:
+        sizes = option("--sizes", ",".join(DEFAULT_SIZES)).split(",")
+        kinds = option("--kinds", ",".join(KINDS)).split(",")
+        report["cases"] = run_cases(kinds, sizes)
+        if option("--compare"):
+            compare(report["cases"], option("--compare"))
+
+    out = json.dumps(report, indent=2)
+    if option("--out"):
+        with open(option("--out"), "w", encoding="utf-8") as f:
+            f.write(out)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
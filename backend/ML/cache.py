@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+
+# Result cache for summaries and diagrams..
+# memory tier : bounded LRU inside the (warm) python process.
+# disk tier   : optional directory of JSON blobs, shared between processes,
+#               evicted by age and by total size.
+
+MEMORY_ENTRIES = int(os.environ.get("VB_CACHE_SIZE", "128"))
+CACHE_DIR = os.environ.get("VB_CACHE_DIR")
+DISK_MAX_BYTES = int(float(os.environ.get("VB_CACHE_MAX_MB", "256")) * 1024 * 1024)
+DISK_MAX_AGE = int(os.environ.get("VB_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+
+def normalize_text(text):
+    """Line endings and trailing spaces don't change results, so they don't change the key either."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def make_key(mode, text, **params):
+    h = hashlib.sha256()
+    h.update(mode.encode("utf-8"))
+    for name in sorted(params):
+        h.update(f"\0{name}={params[name]}".encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_text(text or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+class TieredStore:
+    """
+    Byte blobs under hex keys: a bounded LRU in memory, plus an optional directory of
+    <key><suffix> files shared between processes. Subclasses decide what goes in a blob
+    and count their own hits / misses.
+    """
+
+    def __init__(self, max_entries, cache_dir, max_bytes, max_age, suffix):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.suffix = suffix
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def _get_disk(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                blob = f.read()
+            os.utime(path)
+            return blob
+        except OSError:
+            return None
+
+    def _put_disk(self, key, blob):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        evict_dir(self.cache_dir, self.suffix, self.max_bytes, self.max_age)
+
+    def _put_memory(self, key, blob):
+        if self.max_entries <= 0:
+            return
+        self.memory[key] = blob
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get_blob(self, key):
+        """Returns (blob, tier) or (None, None)."""
+        blob = self.memory.get(key)
+        if blob is not None:
+            self.memory.move_to_end(key)
+            return blob, "memory"
+        if self.cache_dir:
+            blob = self._get_disk(key)
+            if blob is not None:
+                self._put_memory(key, blob)
+                return blob, "disk"
+        return None, None
+
+    def put_blob(self, key, blob):
+        self._put_memory(key, blob)
+        if self.cache_dir:
+            self._put_disk(key, blob)
+
+    def has(self, key):
+        if key in self.memory:
+            return True
+        return bool(self.cache_dir) and os.path.exists(self._path(key))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class ResultCache(TieredStore):
+    def __init__(self, max_entries=MEMORY_ENTRIES, cache_dir=CACHE_DIR,
+                 max_bytes=DISK_MAX_BYTES, max_age=DISK_MAX_AGE):
+        super().__init__(max_entries, cache_dir, max_bytes, max_age, ".json")
+
+    def get(self, key):
+        """Returns (result, tier) or (None, None)."""
+        blob, tier = self.get_blob(key)
+        if blob is None:
+            return None, None
+        try:
+            return json.loads(blob), tier
+        except ValueError:
+            return None, None
+
+    def put(self, key, result):
+        self.put_blob(key, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+    def contains(self, mode, text, **params):
+        return self.has(make_key(mode, text, **params))
+
+    def cached(self, mode, text, compute, **params):
+        """
+        Returns compute() for (mode, text, params), reusing a stored result when there is one.
+        The returned dict carries a "cache" block so callers can measure the hit rate.
+        """
+        key = make_key(mode, text, **params)
+        result, tier = self.get(key)
+        if result is None:
+            self.misses += 1
+            result = compute()
+            self.put(key, result)
+            status = "miss"
+        else:
+            self.hits += 1
+            status = "hit"
+        result = dict(result)
+        result["cache"] = {"status": status, "tier": tier, **self.stats()}
+        return result
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def evict_dir(cache_dir, suffix, max_bytes, max_age):
+    """Drops expired *suffix files, then the least recently used ones until the dir fits max_bytes."""
+    now = time.time()
+    files = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.name.endswith(suffix):
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if now - st.st_mtime > max_age:
+            _remove_quietly(entry.path)
+            continue
+        files.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+    if total <= max_bytes:
+        return
+    files.sort()
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        _remove_quietly(path)
+        total -= size
+
+
+result_cache = ResultCache()
@@ -0,0 +1,58 @@
+import os
+import hashlib
+
+from cache import TieredStore
+
+# Parsed spaCy Docs, kept as DocBin bytes under a hash of the model + text..
+# erDiagram, conceptMap and analyze on the same text then deserialize one parse instead
+# of running the pipeline again.
+# memory tier : bounded LRU of DocBin bytes inside the (warm) python process.
+# disk tier   : optional directory of .spacy files shared between processes; put it on
+#               a tmpfs (e.g. /dev/shm/visualbrief) and the workers share parses through memory.
+
+# opt-in: it pays off for a warm worker or a shared VB_DOC_CACHE_DIR, and every stored
+# parse runs erDiagram's components (ner included) even for conceptMap..
+ENABLED = os.environ.get("VB_DOC_CACHE", "0") == "1"
+MEMORY_ENTRIES = int(os.environ.get("VB_DOC_CACHE_SIZE", "16"))
+CACHE_DIR = os.environ.get("VB_DOC_CACHE_DIR")
+DISK_MAX_BYTES = int(float(os.environ.get("VB_DOC_CACHE_MAX_MB", "512")) * 1024 * 1024)
+DISK_MAX_AGE = int(os.environ.get("VB_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+# longer texts are parsed window by window without keeping the parse; the default is one
+# window (VB_CHUNK_CHARS), so peak memory still follows the window size..
+MAX_CHARS = int(os.environ.get("VB_DOC_CACHE_MAX_CHARS", os.environ.get("VB_CHUNK_CHARS", "100000")))
+
+
+def model_id(nlp):
+    meta = nlp.meta
+    return f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}"
+
+
+class DocStore(TieredStore):
+    def __init__(self, enabled=ENABLED, max_entries=MEMORY_ENTRIES, cache_dir=CACHE_DIR,
+                 max_bytes=DISK_MAX_BYTES, max_age=DISK_MAX_AGE, max_chars=MAX_CHARS):
+        self.enabled = enabled and (max_entries > 0 or bool(cache_dir))
+        self.max_chars = max_chars
+        super().__init__(max_entries, cache_dir if self.enabled else None, max_bytes, max_age, ".spacy")
+
+    def key(self, nlp, text, chunk_chars):
+        """A different model or chunk size gives different Docs, so both are part of the key."""
+        h = hashlib.sha256()
+        h.update(f"{model_id(nlp)}\0{chunk_chars}\0".encode("utf-8"))
+        h.update(text.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    def load(self, nlp, key):
+        """Lazily yields the stored Docs (in chunk order), or None."""
+        blob, _ = self.get_blob(key)
+        if blob is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        from spacy.tokens import DocBin
+        return DocBin().from_bytes(blob).get_docs(nlp.vocab)
+
+    def save(self, key, doc_bin):
+        self.put_blob(key, doc_bin.to_bytes())
+
+
+doc_store = DocStore()
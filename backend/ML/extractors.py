@@ -0,0 +1,250 @@
+import os
+import mmap
+import codecs
+from progress import emit
+
+# File -> text extractors..
+# kept apart from ML_module so pool workers don't import spaCy just to read pages.
+
+# pdfplumber (pdfminer + Pillow) is slow to import, so only the first PDF pays for it..
+pdfplumber = None
+
+
+def get_pdfplumber():
+    """The pdfplumber module, or None if it isn't installed."""
+    global pdfplumber
+    if pdfplumber is None:
+        try:
+            import pdfplumber as module
+        except ImportError:
+            module = False
+        pdfplumber = module
+    return pdfplumber or None
+
+PDF_WORKERS = int(os.environ.get("VB_PDF_WORKERS", "0"))
+# below this many pages the pool start-up costs more than it saves..
+PDF_PARALLEL_MIN_PAGES = 32
+
+
+def _release_page(page):
+    """Drops pdfplumber's cached layout objects for a page we're done with."""
+    if hasattr(page, "close"):
+        page.close()
+    elif hasattr(page, "flush_cache"):
+        page.flush_cache()
+
+
+def _extract_page_range(file_path, start, stop):
+    """Worker side: opens its own handle and returns the text of pages [start, stop)."""
+    texts = []
+    with get_pdfplumber().open(file_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            texts.append(page.extract_text() or "")
+            _release_page(page)
+    return texts
+
+
+def _iter_pages_serial(file_path, max_pages):
+    with get_pdfplumber().open(file_path) as pdf:
+        pages = pdf.pages
+        count = len(pages) if max_pages is None else min(len(pages), max_pages)
+        emit("pages", done=0, total=count)
+        for i in range(count):
+            page = pages[i]
+            text = page.extract_text() or ""
+            _release_page(page)
+            # total in every event, listeners may keep only the latest one..
+            emit("pages", done=i + 1, total=count)
+            yield text
+
+
+def _iter_pages_parallel(file_path, max_pages, workers):
+    with get_pdfplumber().open(file_path) as pdf:
+        count = len(pdf.pages)
+    if max_pages is not None:
+        count = min(count, max_pages)
+    if count < PDF_PARALLEL_MIN_PAGES:
+        yield from _iter_pages_serial(file_path, max_pages)
+        return
+    emit("pages", done=0, total=count)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # a few ranges per worker so one slow range doesn't stall the rest..
+    step = max(1, -(-count // (workers * 4)))
+    starts = list(range(0, count, step))
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        results = pool.map(
+            _extract_page_range,
+            [file_path] * len(starts),
+            starts,
+            [min(s + step, count) for s in starts],
+        )
+        done = 0
+        for texts in results:
+            for text in texts:
+                done += 1
+                emit("pages", done=done, total=count)
+                yield text
+    finally:
+        # caller may stop early (max_chars), don't keep extracting pages nobody reads..
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf_pages(file_path, max_pages=None, max_chars=None, workers=None):
+    """
+    Yields the text of a PDF page by page, in order, releasing each page as it goes.
+    workers > 1 extracts page ranges in a process pool; max_pages / max_chars cap the output.
+    """
+    if workers is None:
+        workers = PDF_WORKERS
+    if workers > 1:
+        pages = _iter_pages_parallel(file_path, max_pages, workers)
+    else:
+        pages = _iter_pages_serial(file_path, max_pages)
+
+    remaining = max_chars
+    try:
+        for text in pages:
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                text = text[:remaining]
+                remaining -= len(text)
+            yield text
+    finally:
+        pages.close()
+
+
+# plain text: decoded block by block straight from an mmap of the file..
+TEXT_BLOCK_BYTES = int(os.environ.get("VB_TEXT_BLOCK_BYTES", str(1 << 20)))
+SNIFF_BYTES = 64 * 1024
+# utf-32 first, its LE BOM starts with the utf-16 LE one..
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def sniff_encoding(sample):
+    """Encoding from the BOM, else from the sample: BOM-less UTF-16, UTF-8, and cp1252 for the rest."""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if b"\x00" in sample:
+        # ASCII-range UTF-16 text has a zero in every other byte..
+        if sample[1::2].count(0) > len(sample) // 4:
+            return "utf-16-le"
+        if sample[0::2].count(0) > len(sample) // 4:
+            return "utf-16-be"
+    try:
+        # final=False, the sample may end in the middle of a character..
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+
+def _cut_point(text):
+    """End of the last paragraph (else line) in text, so sentences don't straddle blocks."""
+    cut = text.rfind("\n\n")
+    if cut < len(text) // 2:
+        cut = text.rfind("\n")
+    return cut + 1 if cut > 0 else len(text)
+
+
+def iter_text_blocks(file_path, max_chars=None, block_bytes=None):
+    """
+    Yields a text file as str blocks of about block_bytes, each ending on a line break.
+    The file is mmapped and decoded incrementally, so only one block is in memory at a
+    time; undecodable bytes become U+FFFD instead of being dropped, CRLF becomes LF.
+    """
+    if block_bytes is None:
+        block_bytes = TEXT_BLOCK_BYTES
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            decoder = codecs.getincrementaldecoder(sniff_encoding(mm[:SNIFF_BYTES]))(errors="replace")
+            remaining = max_chars
+            pending = ""
+            for start in range(0, size, block_bytes):
+                final = start + block_bytes >= size
+                text = pending + decoder.decode(mm[start:start + block_bytes], final=final)
+                text = text.replace("\r\n", "\n")
+                carry = ""
+                if not final and text.endswith("\r"):
+                    # may be the first half of a CRLF split between two blocks..
+                    text, carry = text[:-1], "\r"
+                cut = len(text) if final else _cut_point(text)
+                block, pending = text[:cut], text[cut:] + carry
+                if remaining is not None:
+                    if remaining <= 0:
+                        return
+                    block = block[:remaining]
+                    remaining -= len(block)
+                if block:
+                    yield block
+
+
+# docx: word/document.xml streamed with iterparse, no python-docx object model..
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+W_P, W_T, W_BODY = W_NS + "p", W_NS + "t", W_NS + "body"
+# run-level elements that stand for whitespace..
+W_SPACES = {W_NS + "tab": "\t", W_NS + "br": "\n", W_NS + "cr": "\n"}
+
+
+def iter_docx_paragraphs(file_path, max_chars=None):
+    """
+    Yields the text of every paragraph in document order: body paragraphs, table-cell
+    paragraphs and text boxes (a text box comes out before the paragraph it sits in).
+    Each top-level block is cleared once read, so memory stays bounded on big documents.
+    """
+    import zipfile
+    from xml.etree.ElementTree import iterparse
+
+    remaining = max_chars
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+        body = None
+        depth = 0
+        # text boxes are stored twice (DrawingML + VML fallback), read them once..
+        in_fallback = 0
+        paragraphs = []
+        for event, elem in iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                depth += 1
+                if tag == W_P and not in_fallback:
+                    paragraphs.append([])
+                elif tag == MC_FALLBACK:
+                    in_fallback += 1
+                elif tag == W_BODY:
+                    body = elem
+                continue
+
+            depth -= 1
+            if tag == MC_FALLBACK:
+                in_fallback -= 1
+            elif in_fallback:
+                pass
+            elif tag == W_T and paragraphs:
+                paragraphs[-1].append(elem.text or "")
+            elif tag in W_SPACES and paragraphs:
+                paragraphs[-1].append(W_SPACES[tag])
+            elif tag == W_P:
+                text = "".join(paragraphs.pop())
+                if remaining is not None:
+                    if remaining <= 0:
+                        return
+                    text = text[:remaining]
+                    remaining -= len(text)
+                yield text
+            # document > body > block: drop finished blocks (paragraphs, tables)..
+            if depth == 2 and body is not None:
+                body.clear()
@@ -0,0 +1,369 @@
+import os
+import re
+from functools import lru_cache
+
+# Flowchart compiler..
+# steps are split on newlines / ';', each step is dispatched once on its first word.
+# open if / loop blocks live on a stack, and "tails" are the (node, edge label) pairs
+# the next step has to be connected from, so branches merge back correctly.
+#
+#   one-liners : "x > 5? if yes A, if no B"    "if C -> A else B"    "if C then A"
+#                "if C print A else print B"   "if C: A" / "elif C: A"   "else B" right after a one-liner
+#                "while C: A" / "while C do A" (a one-step loop)
+#   blocks     : "if C:" / "if C then" / "C?" ... "else:" / "elif C:" ... "end if"
+#                "while C:" / "for each x in y:" ... "end while" / "done"
+#                "repeat" ... "until C"
+#   ":" / "then" / "{" / "do" only open a block when they end the step.
+#   "start" / "begin" map to the Start node, "end" / "stop" / ... to the End node.
+
+# parsed steps kept per process, see parse_step()..
+STEP_CACHE_SIZE = int(os.environ.get("VB_STEP_CACHE_SIZE", "65536"))
+STEP_SPLIT_RE = re.compile(r'[\n;]+')
+FIRST_WORD_RE = re.compile(r'[A-Za-z]+|\}')
+LEADING_IF_RE = re.compile(r'^if\s+', re.I)
+QUESTION_YES_RE = re.compile(r'if yes (.+?)(?:$|;|,)', re.I)
+QUESTION_NO_RE = re.compile(r'if no (.+?)(?:$|;|,)', re.I)
+IF_ARROW_RE = re.compile(r'if\s+(.+?)\s*(?:->|\bthen\b)\s*(.+?)\s*(?:\belse\b\s*(.+))?$', re.I)
+IF_INLINE_RE = re.compile(r'if\s+(.+?)\s+(print .+?)\s+else\s+(print .+)', re.I)
+IF_HEAD_RE = re.compile(r'^(?:if|elif|else\s+if)\s+(.+)$', re.I)
+# "C: A" / "C { A }", a ':' between digits (10:30) is not an opener..
+INLINE_BODY_RE = re.compile(r'^(.+?)\s*(?::(?!\d)|\{)\s*(\S.*?)\s*\}?$')
+DO_BODY_RE = re.compile(r'^(.+?)\s+do\s+(\S.*?)$', re.I)
+IF_BLOCK_RE = re.compile(r'^(?:if|elif|else\s+if)\s+(.+?)\s*(?:\bthen\b|:|\{|\bdo\b)?\s*$', re.I)
+ELSE_IF_RE = re.compile(r'^else\s+if\b', re.I)
+ELSE_RE = re.compile(r'^(?:else|otherwise)\s*(->|:)?\s*(.*)$', re.I)
+LOOP_RE = re.compile(r'^(while|loop|repeat|for)\b\s*(.*?)\s*(:|\{|\bdo\b)?\s*$', re.I)
+FOR_RE = re.compile(r'^for\s+(?:each|every|all|\w+\s+(?:in|from|=|:=))\b', re.I)
+UNTIL_RE = re.compile(r'^until\s+(.+?)\s*$', re.I)
+CLOSER_RE = re.compile(
+    r'^(?:end\s*(?:if|while|for|loop|repeat)|endif|endwhile|endfor|endloop|endrepeat|fi|done|\})\s*[.:]?$',
+    re.I,
+)
+START_RE = re.compile(r'\b(?:start|begin)\b', re.I)
+END_RE = re.compile(r'\b(?:end|stop|finish|terminate)\b', re.I)
+
+
+class FlowchartBuilder:
+    def __init__(self):
+        self.nodes = []
+        self.edges = []
+        self.node_map = {}
+        self.frames = []
+        self.awaiting_body = []
+        self.pending_else = None
+        self.start_id = self.node("Start", "()")
+        self.tails = [(self.start_id, "")]
+
+    def node(self, label, shape="[]"):
+        label = " ".join(label.split())
+        if not label:
+            label = " "
+        node_id = self.node_map.get(label)
+        if node_id is None:
+            node_id = f"N{len(self.nodes) + 1}"
+            self.node_map[label] = node_id
+            self.nodes.append({"id": node_id, "label": label, "shape": shape})
+        return node_id
+
+    def edge(self, src, dst, label=""):
+        self.edges.append({"from": src, "to": dst, "label": label})
+
+    def connect(self, node_id):
+        """Links every open tail to node_id, which becomes the only tail."""
+        for src, label in self.tails:
+            if src != node_id or label:
+                self.edge(src, node_id, label)
+        for frame in self.awaiting_body:
+            frame["body_start"] = node_id
+        self.awaiting_body = []
+        self.tails = [(node_id, "")]
+        self.pending_else = None
+
+    # blocks..
+    def open_if(self, cond, chained=False):
+        decision = self.node(f"If {cond.strip().capitalize()}?", "{}")
+        self.connect(decision)
+        self.frames.append({"kind": "if", "decision": decision, "yes_tails": None, "chained": chained})
+        self.tails = [(decision, "Yes")]
+
+    def else_block(self):
+        frame = self.frames[-1]
+        frame["yes_tails"] = self.tails
+        self.tails = [(frame["decision"], "No")]
+
+    def close_frame(self):
+        frame = self.frames.pop()
+        if frame["kind"] == "if":
+            if frame["yes_tails"] is None:
+                self.tails = self.tails + [(frame["decision"], "No")]
+            else:
+                self.tails = frame["yes_tails"] + self.tails
+            if frame["chained"] and self.frames:
+                # "elif" opened a nested if that ends with the same "end if"..
+                self.close_frame()
+        elif frame["kind"] == "loop":
+            for src, label in self.tails:
+                self.edge(src, frame["decision"], label)
+            self.tails = [(frame["decision"], "No")]
+        else:
+            self.close_repeat(frame, "Repeat?", "Yes", "No")
+        self.pending_else = None
+
+    def close_repeat(self, frame, label, again, leave):
+        if frame in self.awaiting_body:
+            self.awaiting_body.remove(frame)
+        decision = self.node(label, "{}")
+        self.connect(decision)
+        self.edge(decision, frame["body_start"] or decision, again)
+        self.tails = [(decision, leave)]
+
+    # one-liners..
+    def branch(self, cond, yes_text, no_text=None):
+        decision = self.node(f"If {cond.strip().capitalize()}?", "{}")
+        self.connect(decision)
+        yes_id = self.node(yes_text.strip().capitalize())
+        self.edge(decision, yes_id, "Yes")
+        if no_text:
+            no_id = self.node(no_text.strip().capitalize())
+            self.edge(decision, no_id, "No")
+            self.tails = [(yes_id, ""), (no_id, "")]
+        else:
+            self.tails = [(yes_id, ""), (decision, "No")]
+            self.pending_else = decision
+
+    def bind_else(self, text):
+        decision = self.pending_else
+        no_id = self.node(text.strip().capitalize())
+        self.edge(decision, no_id, "No")
+        self.tails = [t for t in self.tails if t != (decision, "No")] + [(no_id, "")]
+        self.pending_else = None
+
+    # per-keyword handlers, args come from parse_step(); returning False falls back to a plain step..
+    def on_branch(self, cond, yes_text, no_text):
+        self.branch(cond, yes_text, no_text)
+        return True
+
+    def on_elif_branch(self, cond, body):
+        if self.pending_else:
+            # chained onto the previous one-liner's "No" edge only..
+            decision = self.pending_else
+            others = [t for t in self.tails if t != (decision, "No")]
+            self.tails = [(decision, "No")]
+            self.branch(cond, body)
+            self.tails = others + self.tails
+            return True
+        if self.frames and self.frames[-1]["kind"] == "if" and self.frames[-1]["yes_tails"] is None:
+            # inside a block if : same as "elif C:" then A, so "else:" / "end if" close the whole chain..
+            self.on_elif(cond)
+            self.plain(*parse_step(body)[2][1:])
+            return True
+        self.branch(cond, body)
+        return True
+
+    def on_open_if(self, cond):
+        self.open_if(cond)
+        return True
+
+    def on_elif(self, cond):
+        if self.frames and self.frames[-1]["kind"] == "if" and self.frames[-1]["yes_tails"] is None:
+            self.else_block()
+            self.open_if(cond, chained=True)
+        else:
+            self.open_if(cond)
+        return True
+
+    def on_else(self, sep, text):
+        if self.pending_else:
+            if text:
+                self.bind_else(text)
+            else:
+                # "else:" after a one-liner turns it into a block..
+                decision = self.pending_else
+                yes_tails = [t for t in self.tails if t != (decision, "No")]
+                self.frames.append({"kind": "if", "decision": decision, "yes_tails": yes_tails, "chained": False})
+                self.tails = [(decision, "No")]
+                self.pending_else = None
+            return True
+        if self.frames and self.frames[-1]["kind"] == "if" and self.frames[-1]["yes_tails"] is None:
+            self.else_block()
+            if text:
+                self.plain(*parse_step(text)[2][1:])
+                # "else X" is a one-liner, "else: X" starts a block whose first step is X..
+                if sep != ":":
+                    self.close_frame()
+            return True
+        return False
+
+    def on_loop(self, label):
+        decision = self.node(label, "{}")
+        self.connect(decision)
+        self.frames.append({"kind": "loop", "decision": decision})
+        self.tails = [(decision, "Yes")]
+        return True
+
+    def on_loop_step(self, label, body):
+        self.on_loop(label)
+        self.plain(*parse_step(body)[2][1:])
+        self.close_frame()
+        return True
+
+    def on_repeat(self):
+        frame = {"kind": "repeat", "body_start": None}
+        self.frames.append(frame)
+        self.awaiting_body.append(frame)
+        return True
+
+    def on_until(self, cond):
+        if not self.frames or self.frames[-1]["kind"] != "repeat":
+            return False
+        frame = self.frames.pop()
+        self.close_repeat(frame, f"Until {cond}?", "No", "Yes")
+        self.pending_else = None
+        return True
+
+    def on_close(self, drop_if_stray):
+        if self.frames:
+            self.close_frame()
+            return True
+        # stray "end if" / "}" are dropped, a lone "done" is still a normal step..
+        return drop_if_stray
+
+    def question(self, cond, yes_text, no_text):
+        if yes_text:
+            self.branch(cond, yes_text, no_text)
+        else:
+            self.open_if(cond)
+
+    def plain(self, kind, label):
+        if kind == "start":
+            self.connect(self.start_id)
+        elif kind == "end":
+            self.connect(self.node("End", "()"))
+            # nothing continues after End..
+            self.tails = []
+        else:
+            self.connect(self.node(label, "[]"))
+
+    def feed(self, s):
+        op, args, fallback = parse_step(s)
+        if op and HANDLERS[op](self, *args):
+            return
+        if fallback[0] == "question":
+            self.question(*fallback[1:])
+        else:
+            self.plain(*fallback[1:])
+
+    def finish(self):
+        while self.frames:
+            self.close_frame()
+        if self.tails:
+            self.connect(self.node("End", "()"))
+        return self.nodes, self.edges
+
+
+HANDLERS = {
+    "branch": FlowchartBuilder.on_branch,
+    "open_if": FlowchartBuilder.on_open_if,
+    "elif": FlowchartBuilder.on_elif,
+    "else": FlowchartBuilder.on_else,
+    "loop": FlowchartBuilder.on_loop,
+    "loop_step": FlowchartBuilder.on_loop_step,
+    "elif_branch": FlowchartBuilder.on_elif_branch,
+    "repeat": FlowchartBuilder.on_repeat,
+    "until": FlowchartBuilder.on_until,
+    "close": FlowchartBuilder.on_close,
+}
+
+CLOSER_WORDS = {"end", "endif", "endwhile", "endfor", "endloop", "endrepeat", "fi", "done", "}"}
+
+
+def _inline_body(s):
+    """(cond, body) for "if C: A" / "elif C { A }", None when the opener ends the step."""
+    m = IF_HEAD_RE.match(s)
+    m = INLINE_BODY_RE.match(m.group(1)) if m else None
+    return (m.group(1), m.group(2)) if m else None
+
+
+def _keyword_op(s, word):
+    """(op, args) for a step that starts with a keyword, or (None, ()) if it's not really one."""
+    if word == "if":
+        if "?" in s:
+            return None, ()
+        m = IF_ARROW_RE.match(s) or IF_INLINE_RE.match(s)
+        if m:
+            return "branch", m.groups()
+        body = _inline_body(s)
+        if body:
+            return "branch", body + (None,)
+        m = IF_BLOCK_RE.match(s)
+        return ("open_if", (m.group(1),)) if m else (None, ())
+    if word == "elif" or (word == "else" and ELSE_IF_RE.match(s)):
+        body = _inline_body(s)
+        if body:
+            return "elif_branch", body
+        m = IF_BLOCK_RE.match(s)
+        return ("elif", (m.group(1),)) if m else (None, ())
+    if word in ("else", "otherwise"):
+        m = ELSE_RE.match(s)
+        return ("else", (m.group(1), m.group(2).strip())) if m else (None, ())
+    if word in ("while", "loop", "repeat", "for", "do"):
+        if s.lower().rstrip(":{ ") in ("repeat", "do"):
+            return "repeat", ()
+        m = LOOP_RE.match(s)
+        if not m:
+            return None, ()
+        keyword, rest, marker = m.group(1), m.group(2).rstrip("?").strip(), m.group(3)
+        body = None
+        if keyword.lower() != "repeat" and not marker:
+            inline = INLINE_BODY_RE.match(rest) or DO_BODY_RE.match(rest)
+            if inline:
+                rest, body = inline.group(1).rstrip("?").strip(), inline.group(2)
+                marker = True
+        if keyword.lower() == "for" and not (marker or FOR_RE.match(s)):
+            return None, ()
+        label = f"{keyword} {rest}".strip().capitalize() + "?"
+        return ("loop_step", (label, body)) if body else ("loop", (label,))
+    if word == "until":
+        m = UNTIL_RE.match(s)
+        return ("until", (m.group(1).rstrip("?").strip().capitalize(),)) if m else (None, ())
+    if word in CLOSER_WORDS and CLOSER_RE.match(s):
+        return "close", (s.lower() != "done",)
+    return None, ()
+
+
+@lru_cache(maxsize=STEP_CACHE_SIZE)
+def parse_step(s):
+    """
+    All regex work for one step: (op, args, fallback). It only depends on the step text,
+    so it's memoized; a warm worker recompiling an edited text re-matches only changed steps.
+    """
+    m = FIRST_WORD_RE.match(s)
+    op, args = _keyword_op(s, m.group(0).lower()) if m else (None, ())
+
+    if "?" in s:
+        cond_part, after = s.split("?", 1)
+        yes_match = QUESTION_YES_RE.search(after)
+        no_match = QUESTION_NO_RE.search(after) if yes_match else None
+        fallback = (
+            "question",
+            LEADING_IF_RE.sub('', cond_part.strip()),
+            yes_match.group(1) if yes_match else None,
+            no_match.group(1) if no_match else None,
+        )
+    elif START_RE.search(s):
+        fallback = ("plain", "start", "Start")
+    elif END_RE.search(s):
+        fallback = ("plain", "end", "End")
+    else:
+        fallback = ("plain", "step", s.capitalize())
+    return op, args, fallback
+
+
+def compile_flowchart(text):
+    """Returns (nodes, edges) for pseudo-code text, in one pass over its steps."""
+    builder = FlowchartBuilder()
+    for step in STEP_SPLIT_RE.split(text):
+        step = step.strip()
+        if step:
+            builder.feed(step)
+    return builder.finish()
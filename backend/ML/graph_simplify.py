@@ -0,0 +1,160 @@
+import os
+import re
+from collections import Counter
+
+# Graph clean-up for erDiagram / conceptMap before they go to Mermaid..
+# every step is one or two passes over nodes + edges, so big documents stay cheap;
+# together with the top-K cap in finish_diagram the rendered graph stays small.
+
+SIMPLIFY = os.environ.get("VB_SIMPLIFY", "1") == "1"
+# node budget for these two diagram types even when no max_nodes is given, 0 = none..
+GRAPH_TOP_K = int(os.environ.get("VB_GRAPH_TOP_K", "150"))
+# which nodes survive the top-K cut: "degree" or "pagerank"..
+GRAPH_RANK = os.environ.get("VB_GRAPH_RANK", "degree")
+# a run of at least this many pass-through nodes gets shortened..
+CHAIN_MIN = 2
+# goes into the diagram cache key, results depend on it..
+SETTINGS = f"{int(SIMPLIFY)}:{GRAPH_TOP_K}:{GRAPH_RANK}"
+
+NON_WORD_RE = re.compile(r"[^\w\s]")
+ARTICLES = ("the", "a", "an")
+
+
+def _singular(word):
+    if len(word) > 3 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def label_key(label):
+    """"The Students," / "student" / "a student" all give "student"."""
+    words = NON_WORD_RE.sub(" ", label.lower()).split()
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return " ".join(_singular(w) for w in words) or label
+
+
+def _remap_edges(edges, remap):
+    """Points edges at the surviving ids, dropping self loops and duplicates."""
+    seen = set()
+    out = []
+    for edge in edges:
+        src = remap.get(edge["from"], edge["from"])
+        dst = remap.get(edge["to"], edge["to"])
+        key = (src, dst, edge.get("label"))
+        if src == dst or key in seen:
+            continue
+        seen.add(key)
+        out.append(dict(edge, **{"from": src, "to": dst}))
+    return out
+
+
+def merge_duplicate_labels(nodes, edges):
+    """Near-duplicate labels (case, punctuation, articles, plurals) become the first such node."""
+    keep = {}
+    remap = {}
+    merged = []
+    for node in nodes:
+        key = label_key(node["label"])
+        first = keep.get(key)
+        if first is None:
+            keep[key] = node["id"]
+            merged.append(node)
+        else:
+            remap[node["id"]] = first
+    if not remap:
+        return nodes, edges, 0
+    return merged, _remap_edges(edges, remap), len(remap)
+
+
+def collapse_chains(nodes, edges, min_interior=CHAIN_MIN):
+    """
+    a -> m1 -> m2 -> ... -> mk -> b, where every m has exactly one edge in and one out,
+    becomes a -> m1 -> b; that edge keeps m1's relation label plus "(+k-1 more)".
+    """
+    in_edge = {}
+    out_edge = {}
+    in_count = Counter()
+    out_count = Counter()
+    for i, edge in enumerate(edges):
+        out_count[edge["from"]] += 1
+        in_count[edge["to"]] += 1
+        out_edge[edge["from"]] = i
+        in_edge[edge["to"]] = i
+    through = {
+        node["id"] for node in nodes
+        if in_count[node["id"]] == 1 and out_count[node["id"]] == 1
+    }
+
+    dropped_nodes = set()
+    replaced = {}
+    for node in nodes:
+        head = node["id"]
+        # chains are walked from their first pass-through node, pure cycles have none..
+        if head not in through or edges[in_edge[head]]["from"] in through:
+            continue
+        chain = [head]
+        end = edges[out_edge[head]]["to"]
+        while end in through:
+            chain.append(end)
+            end = edges[out_edge[end]]["to"]
+        if len(chain) < min_interior:
+            continue
+        dropped_nodes.update(chain[1:])
+        for interior in chain[1:]:
+            replaced[out_edge[interior]] = None
+        label = edges[out_edge[head]].get("label")
+        more = f"+{len(chain) - 1} more"
+        replaced[out_edge[head]] = {"from": head, "to": end, "label": f"{label} ({more})" if label else more}
+
+    if not dropped_nodes:
+        return nodes, edges, 0
+    nodes = [n for n in nodes if n["id"] not in dropped_nodes]
+    out = []
+    for i, edge in enumerate(edges):
+        if i not in replaced:
+            out.append(edge)
+        elif replaced[i] is not None:
+            out.append(replaced[i])
+    return nodes, out, len(dropped_nodes)
+
+
+def node_ranks(nodes, edges, method=GRAPH_RANK):
+    """{id: score}: edge count, or PageRank with every edge taken both ways."""
+    if method == "degree":
+        degree = Counter()
+        for edge in edges:
+            degree[edge["from"]] += 1
+            degree[edge["to"]] += 1
+        return degree
+    if method != "pagerank":
+        raise ValueError(f"Unknown rank '{method}', expected 'degree' or 'pagerank'")
+    # numpy only for pagerank, the default path stays import-free..
+    import numpy as np
+    from summarizer import pagerank
+
+    index = {node["id"]: i for i, node in enumerate(nodes)}
+    src = np.fromiter((index[e["from"]] for e in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((index[e["to"]] for e in edges), dtype=np.int64, count=len(edges))
+    rows, cols = np.r_[src, dst], np.r_[dst, src]
+    scores = pagerank(rows, cols, np.ones(len(rows)), len(nodes))
+    return {node["id"]: scores[i] for i, node in enumerate(nodes)}
+
+
+def simplify_graph(nodes, edges, max_nodes=None):
+    """
+    Only for graphs over the max_nodes budget (None = no budget, left alone): merges
+    near-duplicate labels, then shortens chains if that wasn't enough.
+    Returns (nodes, edges, report | None).
+    """
+    if not SIMPLIFY or max_nodes is None or len(nodes) <= max_nodes:
+        return nodes, edges, None
+    nodes, edges, merged = merge_duplicate_labels(nodes, edges)
+    collapsed = 0
+    if len(nodes) > max_nodes:
+        nodes, edges, collapsed = collapse_chains(nodes, edges)
+    if not merged and not collapsed:
+        return nodes, edges, None
+    return nodes, edges, {"merged": merged, "collapsed": collapsed}
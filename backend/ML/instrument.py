@@ -0,0 +1,110 @@
+import os
+import time
+import resource
+from contextlib import contextmanager
+
+# Opt-in per-stage timing for processor.py jobs..
+# VB_PROFILE=1 (or processor.py --profile) adds "timings" / "memory" blocks to every result.
+# VB_PROFILE_OUT=<path>      dumps a cProfile of each job (use "{job}" in the path in serve mode).
+# VB_TRACEMALLOC_OUT=<path>  dumps a tracemalloc snapshot of each job (same "{job}" rule).
+
+enabled = os.environ.get("VB_PROFILE") == "1"
+PROFILE_OUT = os.environ.get("VB_PROFILE_OUT")
+TRACEMALLOC_OUT = os.environ.get("VB_TRACEMALLOC_OUT")
+
+_timings = {}
+_startup = {}
+_job_count = 0
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def record(name, seconds):
+    if enabled:
+        _timings[name] = _timings.get(name, 0.0) + seconds
+
+
+def record_startup(name, seconds):
+    """Process-level costs (imports) that belong to no single job."""
+    _startup[name] = seconds
+
+
+@contextmanager
+def stage(name):
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed_iter(name, iterable):
+    """Counts the time spent producing each item (e.g. nlp.pipe parsing) towards stage name."""
+    if not enabled:
+        yield from iterable
+        return
+    it = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            record(name, time.perf_counter() - start)
+            return
+        record(name, time.perf_counter() - start)
+        yield item
+
+
+def _job_path(template):
+    return template.replace("{job}", str(_job_count))
+
+
+def run_instrumented(fn, *args):
+    """Runs one job; when enabled, attaches timings / memory and writes the optional dumps."""
+    global _job_count
+    if not (enabled or PROFILE_OUT or TRACEMALLOC_OUT):
+        return fn(*args)
+
+    _job_count += 1
+    _timings.clear()
+    profiler = None
+    if PROFILE_OUT:
+        import cProfile
+        profiler = cProfile.Profile()
+    if TRACEMALLOC_OUT:
+        import tracemalloc
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    try:
+        if profiler:
+            result = profiler.runcall(fn, *args)
+        else:
+            result = fn(*args)
+    finally:
+        total = time.perf_counter() - start
+        if profiler:
+            profiler.dump_stats(_job_path(PROFILE_OUT))
+        memory = {"peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+        if TRACEMALLOC_OUT:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.take_snapshot().dump(_job_path(TRACEMALLOC_OUT))
+            tracemalloc.stop()
+            memory["traced_current_mb"] = round(current / 1024 / 1024, 2)
+            memory["traced_peak_mb"] = round(peak / 1024 / 1024, 2)
+
+    if enabled and isinstance(result, dict):
+        result = dict(result)
+        timings = {name: round(secs, 5) for name, secs in _timings.items()}
+        timings["total"] = round(total, 5)
+        result["timings"] = timings
+        result["memory"] = memory
+        if _startup:
+            result["startup"] = {name: round(secs, 5) for name, secs in _startup.items()}
+    return result
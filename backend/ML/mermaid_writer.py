@@ -0,0 +1,82 @@
+import heapq
+from collections import Counter
+
+# Shared Mermaid serializer for every diagram type..
+# nodes : [{"id", "label", "shape"?}], edges : [{"from", "to", "label"}]
+# lines are produced one at a time and joined once, so output is linear in graph size.
+# results travel (and get cached) as JSON, so the source always ends up as one string.
+
+HEADERS = {
+    "erDiagram": "erDiagram",
+    "flowchart": "flowchart TD",
+    "conceptMap": "graph TD",
+}
+
+SHAPES = {"()": ('("', '")'), "{}": ('{"', '"}'), "[]": ('["', '"]')}
+
+
+def escape_label(label):
+    """Mermaid labels are written inside double quotes, so those become single quotes."""
+    return " ".join(str(label).split()).replace('"', "'")
+
+
+def escape_edge_label(label):
+    return escape_label(label).replace("|", "/")
+
+
+def iter_mermaid_lines(kind, nodes, edges):
+    """Yields the Mermaid source line by line (each line ends with a newline)."""
+    yield HEADERS[kind] + "\n"
+    if kind == "erDiagram":
+        for node in nodes:
+            yield f'  {node["id"]} {{\n    string name "{escape_label(node["label"])}"\n  }}\n'
+        for edge in edges:
+            label = escape_label(edge["label"].replace("_", " "))
+            yield f'  {edge["from"]} ||--o{{ {edge["to"]} : "{label}"\n'
+        return
+
+    for node in nodes:
+        left, right = SHAPES.get(node.get("shape", "[]"), SHAPES["[]"])
+        yield f'  {node["id"]}{left}{escape_label(node["label"])}{right}\n'
+    for edge in edges:
+        label = edge.get("label")
+        arrow = f" -->|{escape_edge_label(label)}| " if label else " --> "
+        yield f'  {edge["from"]}{arrow}{edge["to"]}\n'
+
+
+def render_mermaid(kind, nodes, edges):
+    return "".join(iter_mermaid_lines(kind, nodes, edges))
+
+
+def cap_graph(nodes, edges, max_nodes=None, max_edges=None, rank=None):
+    """
+    Keeps the graph within a node / edge budget so the browser renderer stays responsive.
+    The highest-ranked nodes survive (rank is {id: score}, degree by default; ties keep
+    document order), the rest are collapsed into one "+N more" node; edges are kept in
+    order up to max_edges.
+    Returns (nodes, edges, truncated) where truncated is None if nothing was cut.
+    """
+    total_edges = len(edges)
+    dropped_nodes = 0
+    if max_nodes is not None and len(nodes) > max_nodes:
+        if rank is None:
+            rank = Counter()
+            for edge in edges:
+                rank[edge["from"]] += 1
+                rank[edge["to"]] += 1
+        # one slot goes to the "+N more" node..
+        keep_count = max(max_nodes - 1, 0)
+        kept = heapq.nsmallest(keep_count, range(len(nodes)), key=lambda i: (-rank.get(nodes[i]["id"], 0), i))
+        kept_ids = {nodes[i]["id"] for i in kept}
+        dropped_nodes = len(nodes) - len(kept)
+        nodes = [nodes[i] for i in sorted(kept)]
+        nodes.append({"id": "MORE_NODES", "label": f"+{dropped_nodes} more", "shape": "()"})
+        edges = [e for e in edges if e["from"] in kept_ids and e["to"] in kept_ids]
+
+    if max_edges is not None and len(edges) > max_edges:
+        edges = edges[:max_edges]
+    dropped_edges = total_edges - len(edges)
+
+    if not dropped_nodes and not dropped_edges:
+        return nodes, edges, None
+    return nodes, edges, {"nodes": dropped_nodes, "edges": dropped_edges}
@@ -2,57 +2,307 @@ import sys
 import json
 import io
 import os
-import nltk
-import contextlib
-import tempfile
-def silence_all():
-    """Redirect stdout and stderr fully to /dev/null during setup."""
-    sys.stdout.flush()
-    sys.stderr.flush()
-    devnull = open(os.devnull, 'w')
-    sys.stdout = devnull
-    sys.stderr = devnull
+import time
+_import_start = time.perf_counter()
 
-def restore_output():
-    """Restore clean stdout and stderr after setup."""
-    sys.stdout = io.TextIOWrapper(sys.__stdout__.buffer, encoding='utf-8')
-    sys.stderr = io.TextIOWrapper(sys.__stderr__.buffer, encoding='utf-8')
-silence_all()
+from collections import deque
+from ML_module import parse_file, generate_summary, generate_diagram, analyze_text, generate_diagrams_batch, get_nlp, update_diagram
+from ML_module import is_streamable, summarize_blocks, diagram_from_blocks, analyze_blocks
+from extractors import iter_text_blocks
+import instrument
+import progress
+from instrument import run_instrumented
 
-try:
-    nltk.data.find("tokenizers/punkt")
-except LookupError:
-    with contextlib.redirect_stdout(open(os.devnull, "w")), contextlib.redirect_stderr(open(os.devnull, "w")):
-        nltk.download("punkt", quiet=True)
+instrument.record_startup("import", time.perf_counter() - _import_start)
 
-restore_output()
-from ML_module import parse_file, generate_summary, generate_diagram
 
-mode = sys.argv[1]
-diagram_type = "flowchart"
+def run_job(job):
+    """Runs one job dict ({mode, text | file, diagram_type}) and returns the result dict."""
+    mode = job.get("mode")
+    diagram_type = job.get("diagram_type") or "flowchart"
+    caps = {k: job[k] for k in ("max_nodes", "max_edges") if job.get(k)}
+    summary_options = {
+        "n": job.get("n", 5),
+        "scoring": job.get("scoring", "frequency"),
+        "length_norm": bool(job.get("length_norm")),
+    }
+    if mode == "update":
+        # text or edits against previous["state"], never a file..
+        return update_diagram(job.get("text"), diagram_type, job.get("previous"), job.get("edits"), **caps)
+
+    text = job.get("text")
+    if text is None and job.get("file") and mode in ("summary", "diagram", "analyze") and is_streamable(job["file"]):
+        # huge plain-text file: fed through as blocks, skips the (whole-text keyed) cache..
+        blocks = iter_text_blocks(job["file"], job.get("max_chars"))
+        if mode == "summary":
+            return summarize_blocks(blocks, **summary_options)
+        if mode == "analyze":
+            return analyze_blocks(blocks, diagram_type, **summary_options, **caps)
+        return diagram_from_blocks(blocks, diagram_type, **caps)
+
+    if text is None:
+        limits = {k: job[k] for k in ("max_pages", "max_chars") if job.get(k)}
+        text = parse_file(job["file"], **limits) if job.get("file") else ""
 
-if len(sys.argv) > 2:
-    if sys.argv[2] == "-t":
-        text = sys.argv[3]
-        if len(sys.argv) > 4:
-            diagram_type = sys.argv[4]
-    else:
-        file_path = sys.argv[2]
-        text = parse_file(file_path)
-        if len(sys.argv) > 3:
-            diagram_type = sys.argv[3]
-else:
-    text = sys.stdin.read()
-
-try:
     if mode == "parse":
-        print(json.dumps({"text": text}, ensure_ascii=False))
+        return {"text": text}
     elif mode == "summary":
-        print(json.dumps(generate_summary(text), ensure_ascii=False))
+        return generate_summary(text, **summary_options)
     elif mode == "diagram":
-        diagram_data = generate_diagram(text, diagram_type)
-        print(json.dumps(diagram_data, ensure_ascii=False))
+        return generate_diagram(text, diagram_type, **caps)
+    elif mode == "analyze":
+        return analyze_text(text, diagram_type, **summary_options, **caps)
+    return {"error": "Invalid mode"}
+
+
+def handle_line(line):
+    """Decodes one NDJSON job line and returns the JSON response line (or None for blank lines)."""
+    line = line.strip()
+    if not line:
+        return None
+    job_id = None
+    try:
+        job = json.loads(line)
+        job_id = job.get("id")
+        result = dict(run_instrumented(run_job, job))
+    except Exception as e:
+        result = {"error": str(e)}
+    if job_id is not None:
+        result["id"] = job_id
+    return json.dumps(result, ensure_ascii=False)
+
+
+def serve(reader, writer):
+    """Warm worker loop: one JSON job per input line, one JSON result per output line."""
+    for line in reader:
+        response = handle_line(line)
+        if response is not None:
+            writer.write(response + "\n")
+            writer.flush()
+
+
+def serve_socket(socket_path):
+    """Same protocol as serve(), but over a local Unix socket (one connection at a time)."""
+    import socketserver
+
+    class JobHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            reader = io.TextIOWrapper(self.rfile, encoding="utf-8")
+            writer = io.TextIOWrapper(self.wfile, encoding="utf-8")
+            serve(reader, writer)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with socketserver.UnixStreamServer(socket_path, JobHandler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+
+def iter_batch_inputs(source):
+    """Yields (id, text) from a directory of documents or a .jsonl of {"id", "text" | "file"} lines."""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if os.path.isfile(path):
+                yield name, parse_file(path)
+        return
+    with open(source, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            text = item.get("text")
+            if text is None:
+                text = parse_file(item["file"]) if item.get("file") else ""
+            yield item.get("id", i), text
+
+
+def run_batch(argv, writer):
+    """batch <dir|jsonl> [diagram_type] [--batch-size N] [--n-process N] -> JSON Lines on writer."""
+    positional = []
+    options = {"batch_size": 64, "n_process": 1}
+    i = 0
+    while i < len(argv):
+        if argv[i] in ("--batch-size", "--n-process"):
+            options[argv[i][2:].replace("-", "_")] = int(argv[i + 1])
+            i += 2
+        else:
+            positional.append(argv[i])
+            i += 1
+    source = positional[0]
+    diagram_type = positional[1] if len(positional) > 1 else "erDiagram"
+
+    # results come back in input order, so ids just queue up alongside the texts..
+    ids = deque()
+
+    def texts():
+        for doc_id, text in iter_batch_inputs(source):
+            ids.append(doc_id)
+            yield text
+
+    for diagram in generate_diagrams_batch(texts(), diagram_type, **options):
+        diagram["id"] = ids.popleft()
+        writer.write(json.dumps(diagram, ensure_ascii=False) + "\n")
+    writer.flush()
+
+
+def read_envelope(argv):
+    """
+    job [--input-file <path>] : one JSON job ({mode, text | file, diagram_type, ...}) from the
+    file or from stdin. Text never goes through argv, so there's no ARG_MAX limit and it doesn't
+    show up in the process list; json.loads takes the raw bytes, no separate decode step.
+    """
+    if "--input-file" in argv:
+        with open(argv[argv.index("--input-file") + 1], "rb") as f:
+            data = f.read()
     else:
-        print(json.dumps({"error": "Invalid mode"}, ensure_ascii=False))
-except Exception as e:
-    print(json.dumps({"error": str(e)}, ensure_ascii=False))
\ No newline at end of file
+        data = sys.stdin.buffer.read()
+    job = json.loads(data)
+    if not isinstance(job, dict):
+        raise ValueError("Job must be a JSON object")
+    return job
+
+
+class JobAborted(BaseException):
+    """
+    Raised inside a running job on cancel / timeout / memory ceiling. A BaseException, so
+    the broad `except Exception` fallbacks in the pipeline can't swallow it.
+    """
+
+
+def _abort(reason):
+    def handler(signum, frame):
+        raise JobAborted(reason)
+    return handler
+
+
+def apply_limits(job):
+    """
+    SIGTERM cancels the job, "timeout" (seconds) arms an alarm and "max_memory_mb" starts a
+    thread that watches peak RSS; each one ends the job with an error result instead of a kill.
+    """
+    import signal
+    import threading
+    import resource
+
+    signal.signal(signal.SIGTERM, _abort("Job cancelled"))
+    if job.get("timeout"):
+        signal.signal(signal.SIGALRM, _abort("Job timed out"))
+        signal.setitimer(signal.ITIMER_REAL, float(job["timeout"]))
+    if job.get("max_memory_mb"):
+        signal.signal(signal.SIGUSR1, _abort("Job exceeded memory limit"))
+        # ru_maxrss is KB on Linux..
+        limit_kb = float(job["max_memory_mb"]) * 1024
+
+        def watch():
+            while resource.getrusage(resource.RUSAGE_SELF).ru_maxrss <= limit_kb:
+                time.sleep(0.2)
+            # handlers only run on the main thread, so signal it rather than raising here..
+            os.kill(os.getpid(), signal.SIGUSR1)
+
+        threading.Thread(target=watch, daemon=True).start()
+
+
+def clear_limits():
+    """Disarms the timeout and ignores late cancel / memory signals so the result line gets written."""
+    import signal
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    for signum in (signal.SIGTERM, signal.SIGUSR1):
+        signal.signal(signum, signal.SIG_IGN)
+
+
+def write_progress(stage, counts):
+    sys.stdout.write(json.dumps({"progress": {"stage": stage, **counts}}) + "\n")
+    sys.stdout.flush()
+
+
+def setup():
+    """One-off install step: NLTK data and the spaCy model. Requests never download anything."""
+    import subprocess
+    import nltk
+    for package in ("punkt", "punkt_tab", "stopwords"):
+        nltk.download(package, quiet=True)
+    subprocess.run([sys.executable, "-m", "spacy", "download", "en_core_web_sm"], check=True)
+
+
+def main():
+    """
+    CLI entry point. Only runs as __main__: pool workers (PDF pages, spaCy n_process for
+    batch) started with spawn / forkserver re-import this module and must not run the CLI again.
+    """
+    # Node reads utf-8 JSON whatever the locale says..
+    sys.stdout = io.TextIOWrapper(sys.__stdout__.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.__stderr__.buffer, encoding='utf-8')
+
+    # --profile anywhere on the command line is the same as VB_PROFILE=1..
+    if "--profile" in sys.argv:
+        sys.argv.remove("--profile")
+        instrument.enable()
+
+    mode = sys.argv[1]
+
+    if mode == "setup":
+        setup()
+        return
+
+    if mode == "job":
+        # job [--input-file <path>] [--progress] : progress events as {"progress": {...}} lines, then the result line..
+        try:
+            job = read_envelope(sys.argv[2:])
+            if "--progress" in sys.argv or job.get("progress"):
+                progress.set_listener(write_progress)
+            apply_limits(job)
+            result = run_instrumented(run_job, job)
+            clear_limits()
+        except (JobAborted, Exception) as e:
+            clear_limits()
+            result = {"error": str(e)}
+        progress.set_listener(None)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    if mode == "batch":
+        run_batch(sys.argv[2:], sys.stdout)
+        return
+
+    if mode == "serve":
+        # load the model up front so every job after this is warm..
+        load_start = time.perf_counter()
+        try:
+            get_nlp()
+            instrument.record_startup("model_load", time.perf_counter() - load_start)
+        except (ImportError, OSError) as e:
+            # keep serving, flowchart / parse don't need the model and NLP jobs get {"error"}..
+            print(f"serve: model not loaded ({e})", file=sys.stderr)
+        if len(sys.argv) > 3 and sys.argv[2] == "--socket":
+            serve_socket(sys.argv[3])
+        else:
+            serve(io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8"), sys.stdout)
+        return
+
+    job = {"mode": mode, "diagram_type": "flowchart"}
+
+    if len(sys.argv) > 2:
+        if sys.argv[2] == "-t":
+            job["text"] = sys.argv[3]
+            if len(sys.argv) > 4:
+                job["diagram_type"] = sys.argv[4]
+        else:
+            # parsed inside run_job, so parse_file shows up in the timings..
+            job["file"] = sys.argv[2]
+            if len(sys.argv) > 3:
+                job["diagram_type"] = sys.argv[3]
+    else:
+        job["text"] = sys.stdin.read()
+
+    try:
+        print(json.dumps(run_instrumented(run_job, job), ensure_ascii=False))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+# Progress events for long jobs..
+# processor.py job --progress installs a listener that writes them as JSON lines;
+# with no listener emit() is just a None check, so the normal paths pay nothing.
+
+_listener = None
+
+
+def set_listener(callback):
+    """callback(stage, counts) is called for every event, None switches events off."""
+    global _listener
+    _listener = callback
+
+
+def emit(stage, **counts):
+    if _listener is not None:
+        _listener(stage, counts)
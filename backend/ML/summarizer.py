@@ -0,0 +1,274 @@
+import os
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+# Extractive summary engine..
+# each sentence is tokenized once into a sparse sentence x term matrix kept as
+# COO arrays (row, col, count); scoring every sentence is then one weighted bincount.
+# textrank / mmr instead embed sentences and pick with MMR, so near-duplicates don't both make it.
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+TERM_SCORINGS = ("frequency", "tfidf")
+EMBEDDING_SCORINGS = ("textrank", "mmr")
+SCORINGS = TERM_SCORINGS + EMBEDDING_SCORINGS
+
+_stop_words = None
+
+
+def get_stop_words():
+    """English stopwords from local NLTK data, else spaCy's built-in list. Never downloads."""
+    global _stop_words
+    if _stop_words is None:
+        try:
+            from nltk.corpus import stopwords
+            _stop_words = frozenset(stopwords.words("english"))
+        except (ImportError, LookupError):
+            from spacy.lang.en.stop_words import STOP_WORDS
+            _stop_words = frozenset(STOP_WORDS)
+    return _stop_words
+
+
+def build_matrix(sentences):
+    """
+    Returns (rows, cols, counts, vocab, lengths) for the sentence x term matrix.
+    Only alphabetic tokens are kept, lengths is the no. of such tokens per sentence.
+    """
+    vocab = {}
+    rows, cols, counts = [], [], []
+    lengths = np.zeros(len(sentences), dtype=np.int64)
+    for i, sent in enumerate(sentences):
+        tokens = WORD_RE.findall(sent.lower())
+        lengths[i] = len(tokens)
+        for term, count in Counter(tokens).items():
+            col = vocab.get(term)
+            if col is None:
+                col = vocab[term] = len(vocab)
+            rows.append(i)
+            cols.append(col)
+            counts.append(count)
+    return (
+        np.asarray(rows, dtype=np.int64),
+        np.asarray(cols, dtype=np.int64),
+        np.asarray(counts, dtype=np.float64),
+        vocab,
+        lengths,
+    )
+
+
+def score_sentences(sentences, scoring="frequency", length_norm=False):
+    """
+    Scores all sentences in one batched pass.
+    frequency : sum of document-wide term frequencies of the sentence's words (stopwords count 0).
+    tfidf     : sum of tf * idf with sentences as documents.
+    length_norm divides by sentence length so long sentences don't win by default.
+    """
+    if scoring not in TERM_SCORINGS:
+        raise ValueError(f"Unknown scoring '{scoring}', expected one of {TERM_SCORINGS}")
+    n_sent = len(sentences)
+    if not n_sent:
+        return np.zeros(0)
+
+    rows, cols, counts, vocab, lengths = build_matrix(sentences)
+    n_terms = len(vocab)
+    if not n_terms:
+        return np.zeros(n_sent)
+
+    keep = np.ones(n_terms)
+    stop_words = get_stop_words()
+    for term, col in vocab.items():
+        if term in stop_words:
+            keep[col] = 0.0
+
+    if scoring == "frequency":
+        weights = np.bincount(cols, weights=counts, minlength=n_terms) * keep
+    else:
+        df = np.bincount(cols, minlength=n_terms)
+        weights = (np.log(n_sent / df) + 1.0) * keep
+
+    scores = np.bincount(rows, weights=counts * weights[cols], minlength=n_sent)
+    if length_norm:
+        scores = scores / np.maximum(lengths, 1)
+    return scores
+
+
+# sentence embeddings..
+HASH_DIM = 256
+# above this many sentences TextRank runs on an LSH neighbour graph, not the n x n matrix..
+EXACT_MAX_SENTENCES = int(os.environ.get("VB_SUMMARY_EXACT_MAX", "2000"))
+LSH_TABLES = 4
+LSH_BITS = 12
+LSH_BLOCK = 32
+NEIGHBOURS = 10
+DAMPING = 0.85
+MMR_LAMBDA = 0.5
+
+
+def _hashed_feature(feature):
+    """(bucket, sign) for a word / bigram; crc32 so it's the same in every process."""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % HASH_DIM, (1.0 if h & 0x80000000 else -1.0)
+
+
+def sentence_vectors(sentences, vectors=None):
+    """
+    L2-normalized (n, dim) float32 sentence embeddings, stopwords left out.
+    vectors : a spaCy Vectors table, sentences are the sum of their word vectors.
+    Without one, words and word bigrams are hashed into HASH_DIM signed buckets.
+    """
+    stop_words = get_stop_words()
+    dim = vectors.shape[1] if vectors is not None else HASH_DIM
+    rows, cols, vals = [], [], []
+    vector_rows = []
+    lookup = {}
+    for i, sent in enumerate(sentences):
+        tokens = [t for t in WORD_RE.findall(sent.lower()) if t not in stop_words]
+        if vectors is not None:
+            for token in tokens:
+                row = lookup.get(token)
+                if row is None:
+                    row = lookup[token] = vectors.find(key=token)
+                if row >= 0:
+                    rows.append(i)
+                    vector_rows.append(row)
+            continue
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            hit = lookup.get(feature)
+            if hit is None:
+                hit = lookup[feature] = _hashed_feature(feature)
+            rows.append(i)
+            cols.append(hit[0])
+            vals.append(hit[1])
+
+    out = np.zeros((len(sentences), dim), dtype=np.float32)
+    if vectors is not None:
+        if rows:
+            np.add.at(out, np.asarray(rows), np.asarray(vectors.data)[np.asarray(vector_rows)])
+    elif rows:
+        np.add.at(out, (np.asarray(rows), np.asarray(cols)), np.asarray(vals, dtype=np.float32))
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.maximum(norms, 1e-12)
+
+
+def _top_k_per_row(i, j, sim, n, k):
+    """Dedupes (i, j) pairs and keeps the k most similar j for every i."""
+    _, first = np.unique(i * n + j, return_index=True)
+    i, j, sim = i[first], j[first], sim[first]
+    order = np.lexsort((-sim, i))
+    i, j, sim = i[order], j[order], sim[order]
+    starts = np.flatnonzero(np.r_[True, i[1:] != i[:-1]])
+    rank = np.arange(len(i)) - np.repeat(starts, np.diff(np.r_[starts, len(i)]))
+    keep = rank < k
+    return i[keep], j[keep], sim[keep]
+
+
+def similarity_graph(emb, seed=0):
+    """
+    Weighted similarity edges (rows, cols, weights), negative / self similarity dropped.
+    Up to EXACT_MAX_SENTENCES it's the full matrix; above, random-hyperplane LSH: only
+    sentences sharing a bucket in one of LSH_TABLES tables are compared (in blocks of
+    LSH_BLOCK) and each keeps its NEIGHBOURS best, so memory is O(n * NEIGHBOURS).
+    """
+    n = len(emb)
+    if n <= EXACT_MAX_SENTENCES:
+        sim = emb @ emb.T
+        np.fill_diagonal(sim, 0.0)
+        rows, cols = np.nonzero(sim > 0)
+        return rows, cols, sim[rows, cols]
+
+    rng = np.random.default_rng(seed)
+    weights_of_bits = 1 << np.arange(LSH_BITS)
+    kept = (np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32))
+    for _ in range(LSH_TABLES):
+        planes = rng.standard_normal((emb.shape[1], LSH_BITS)).astype(np.float32)
+        codes = ((emb @ planes) > 0) @ weights_of_bits
+        order = np.argsort(codes, kind="stable")
+        found = [kept]
+        for bucket in np.split(order, np.flatnonzero(np.diff(codes[order])) + 1):
+            for start in range(0, len(bucket), LSH_BLOCK):
+                block = bucket[start:start + LSH_BLOCK]
+                if len(block) < 2:
+                    continue
+                sim = emb[block] @ emb[block].T
+                np.fill_diagonal(sim, 0.0)
+                a, b = np.nonzero(sim > 0)
+                found.append((block[a], block[b], sim[a, b]))
+        kept = _top_k_per_row(*(np.concatenate(parts) for parts in zip(*found)), n, NEIGHBOURS)
+
+    # undirected: each kept edge goes both ways..
+    i, j, sim = kept
+    rows, cols, weights = np.r_[i, j], np.r_[j, i], np.r_[sim, sim]
+    _, first = np.unique(rows * n + cols, return_index=True)
+    return rows[first], cols[first], weights[first]
+
+
+def pagerank(rows, cols, weights, n, damping=DAMPING, iterations=100, tol=1e-6):
+    """Power iteration over the weighted edge list, one bincount per step."""
+    out_weight = np.bincount(rows, weights=weights, minlength=n)
+    share = weights / out_weight[rows] if len(rows) else weights
+    dangling = out_weight == 0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        spread = np.bincount(cols, weights=share * rank[rows], minlength=n)
+        new = (1.0 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+        done = np.abs(new - rank).sum() < tol
+        rank = new
+        if done:
+            break
+    return rank
+
+
+def mmr_select(emb, relevance, n, lam=MMR_LAMBDA):
+    """
+    Greedy Maximal Marginal Relevance: relevance minus the highest cosine similarity to what's
+    already picked. Relevance is scaled to a max of 1 so both terms are on the cosine scale.
+    """
+    top = relevance.max()
+    relevance = relevance / top if top > 0 else np.zeros(len(relevance))
+    redundancy = np.zeros(len(relevance))
+    picked = []
+    for _ in range(n):
+        score = lam * relevance - (1.0 - lam) * redundancy
+        score[picked] = -np.inf
+        best = int(np.argmax(score))
+        picked.append(best)
+        redundancy = np.maximum(redundancy, emb @ emb[best])
+    return picked
+
+
+def embedding_pick(sentences, n, scoring, vectors=None):
+    """
+    textrank : relevance is PageRank centrality on the sentence similarity graph.
+    mmr      : relevance is similarity to the document centroid (no graph at all).
+    Either way the n sentences are then picked with MMR.
+    """
+    emb = sentence_vectors(sentences, vectors)
+    if scoring == "textrank":
+        relevance = pagerank(*similarity_graph(emb), len(sentences))
+    else:
+        centroid = emb.mean(axis=0)
+        relevance = emb @ (centroid / max(np.linalg.norm(centroid), 1e-12))
+    return mmr_select(emb, relevance, n)
+
+
+def top_sentences(sentences, n=5, scoring="frequency", length_norm=False, vectors=None):
+    """
+    Top-n sentences by score, returned in original document order.
+    vectors (spaCy Vectors) is only used by the embedding scorings, length_norm only by the term ones.
+    """
+    if scoring not in SCORINGS:
+        raise ValueError(f"Unknown scoring '{scoring}', expected one of {SCORINGS}")
+    if scoring in EMBEDDING_SCORINGS:
+        if n >= len(sentences):
+            return list(sentences)
+        picked = embedding_pick(sentences, n, scoring, vectors)
+        return [sentences[i] for i in sorted(picked)]
+
+    scores = score_sentences(sentences, scoring, length_norm)
+    if n >= len(sentences):
+        return list(sentences)
+    # stable sort on -score keeps the earlier sentence on ties..
+    picked = np.argsort(-scores, kind="stable")[:n]
+    return [sentences[i] for i in np.sort(picked)]
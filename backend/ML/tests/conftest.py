@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the ML modules are flat scripts next to this folder, not a package..
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
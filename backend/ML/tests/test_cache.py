@@ -0,0 +1,45 @@
+from cache import ResultCache, make_key
+from doc_store import DocStore
+
+
+def test_result_cache_disk_tier_is_shared_between_instances(tmp_path):
+    first = ResultCache(max_entries=4, cache_dir=str(tmp_path))
+    result = first.cached("summary", "Some text.", lambda: {"content": "é"}, n=1)
+    assert result["cache"]["status"] == "miss"
+
+    second = ResultCache(max_entries=4, cache_dir=str(tmp_path))
+    assert second.contains("summary", "Some text.", n=1)
+    result = second.cached("summary", "Some text.", lambda: {"content": "other"}, n=1)
+    assert result["content"] == "é"
+    assert result["cache"]["tier"] == "disk"
+
+
+def test_result_cache_reads_existing_json_files(tmp_path):
+    key = make_key("diagram", "x", diagram_type="flowchart")
+    (tmp_path / (key + ".json")).write_text('{"mermaid": "flowchart TD"}', encoding="utf-8")
+    cache = ResultCache(max_entries=0, cache_dir=str(tmp_path))
+    assert cache.get(key) == ({"mermaid": "flowchart TD"}, "disk")
+
+
+class FakeDocBin:
+    def __init__(self, data):
+        self.data = data
+
+    def to_bytes(self):
+        return self.data
+
+
+def test_doc_store_evicts_by_count_and_size(tmp_path):
+    store = DocStore(enabled=True, max_entries=2, cache_dir=str(tmp_path), max_bytes=2500)
+    keys = [f"{i:064x}" for i in range(4)]
+    for key in keys:
+        store.save(key, FakeDocBin(b"x" * 1000))
+    assert list(store.memory) == keys[2:]
+    assert len(list(tmp_path.glob("*.spacy"))) == 2
+    assert store.has(keys[-1]) and not store.has(keys[0])
+
+
+def test_doc_store_disabled_keeps_nothing_on_disk(tmp_path):
+    store = DocStore(enabled=False, cache_dir=str(tmp_path / "docs"))
+    assert not store.enabled
+    assert not (tmp_path / "docs").exists()
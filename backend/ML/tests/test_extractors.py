@@ -0,0 +1,18 @@
+from extractors import iter_text_blocks
+
+
+def test_crlf_split_between_blocks_is_normalised(tmp_path):
+    # lines longer than the block size, so blocks end mid-line and some cut "\r" | "\n"..
+    text = "first line here\r\nsecond line\r\n\r\nthird\r\nlast"
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(text.encode("utf-8"))
+    expected = text.replace("\r\n", "\n")
+    for block_bytes in range(1, len(text) + 2):
+        blocks = list(iter_text_blocks(str(path), block_bytes=block_bytes))
+        assert "".join(blocks) == expected, block_bytes
+
+
+def test_lone_cr_at_end_of_file_is_kept(tmp_path):
+    path = tmp_path / "cr.txt"
+    path.write_bytes(b"abc\r")
+    assert "".join(iter_text_blocks(str(path), block_bytes=2)) == "abc\r"
@@ -0,0 +1,46 @@
+from flowchart import compile_flowchart
+
+
+def labelled_edges(text):
+    """{(from label, edge label, to label)} for compiled text."""
+    nodes, edges = compile_flowchart(text)
+    label = {node["id"]: node["label"] for node in nodes}
+    return {(label[e["from"]], e["label"], label[e["to"]]) for e in edges}
+
+
+def test_inline_elif_in_block_if_rejoins_after_end_if():
+    edges = labelled_edges("if a:\nx\nelif b: y\nelse:\nz\nend if\nw")
+    assert edges == {
+        ("Start", "", "If A?"),
+        ("If A?", "Yes", "X"),
+        ("If A?", "No", "If B?"),
+        ("If B?", "Yes", "Y"),
+        ("If B?", "No", "Z"),
+        ("X", "", "W"),
+        ("Y", "", "W"),
+        ("Z", "", "W"),
+        ("W", "", "End"),
+    }
+
+
+def test_inline_elif_in_block_if_without_else():
+    edges = labelled_edges("if a:\nx\nelif b: y\nend if\nw")
+    assert {("X", "", "W"), ("Y", "", "W"), ("If B?", "No", "W")} <= edges
+    assert ("X", "", "End") not in edges
+
+
+def test_inline_if_keeps_following_steps_out_of_the_branch():
+    edges = labelled_edges("start; if x > 5: print big; read y; end")
+    assert edges == {
+        ("Start", "", "If X > 5?"),
+        ("If X > 5?", "Yes", "Print big"),
+        ("If X > 5?", "No", "Read y"),
+        ("Print big", "", "Read y"),
+        ("Read y", "", "End"),
+    }
+
+
+def test_inline_while_is_a_one_step_loop():
+    edges = labelled_edges("while x < 10: x = x + 1; print x; end")
+    assert ("X = x + 1", "", "While x < 10?") in edges
+    assert ("While x < 10?", "No", "Print x") in edges
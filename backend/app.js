@@ -4,14 +4,18 @@ const cors = require("cors");
 const path = require("path");
 const fs = require("fs");
 const {
-  generateSummary,
-  generateDiagramFromFile,
+  analyzeFile,
   generateDiagramFromText,
+  updateDiagramFromText,
 } = require("./processor");
+const { submitJob, getJob, cancelJob } = require("./jobQueue");
+
+// JSON bodies carry whole documents (and /diagram's "previous" state), not express's 100kb default..
+const JSON_LIMIT = process.env.JSON_LIMIT || "50mb";
 
 const app = express();
 app.use(cors());
-app.use(express.json());
+app.use(express.json({ limit: JSON_LIMIT }));
 app.use("/uploads", express.static(path.join(__dirname, "uploads")));
 
 const storage = multer.diskStorage({
@@ -29,8 +33,9 @@ app.post("/upload", upload.single("file"), async (req, res) => {
   try {
     if (!req.file) return res.status(400).json({ error: "No file uploaded." });
     const diagramType = req.body.diagramType || "flowchart";
-    const summary = await generateSummary(req.file.path);
-    const diagram = await generateDiagramFromFile(req.file.path,diagramType);
+    // one python run, file is parsed once for both summ. and diag...
+    const { summary, diagram, error } = await analyzeFile(req.file.path, diagramType);
+    if (error) throw new Error(error);
 
     // adding file delition after processing file..
     const filePath = path.resolve(req.file.path); 
@@ -51,14 +56,44 @@ app.post("/upload", upload.single("file"), async (req, res) => {
   }
 });
 
+// same as /upload but queued, answers right away with a job id to poll..
+app.post("/jobs", upload.single("file"), (req, res) => {
+  if (!req.file) return res.status(400).json({ error: "No file uploaded." });
+  const diagramType = req.body.diagramType || "flowchart";
+  const filePath = path.resolve(req.file.path);
+  const jobId = submitJob({ mode: "analyze", file: filePath, diagram_type: diagramType }, () => {
+    fs.unlink(filePath, (err) => {
+      if (err) console.error("Failed to delete uploaded file:", err);
+    });
+  });
+  res.status(202).json({ jobId });
+});
+
+// status, progress ({pages, sentences, entities, diagram}) and, once done, {summary, diagram}..
+app.get("/jobs/:id", (req, res) => {
+  const job = getJob(req.params.id);
+  if (!job) return res.status(404).json({ error: "Job not found" });
+  // same payload as /upload, the extracted text stays on the server..
+  if (job.result) job.result = { summary: job.result.summary, diagram: job.result.diagram };
+  res.json(job);
+});
+
+app.delete("/jobs/:id", (req, res) => {
+  if (!cancelJob(req.params.id)) return res.status(404).json({ error: "Job not found" });
+  res.json(getJob(req.params.id));
+});
+
 // Custom diag from cust. text input..
 app.post("/diagram", async (req, res) => {
   try {
-    const { text, diagramType } = req.body;
-    if (!text || !diagramType)
+    const { text, diagramType, previous, edits } = req.body;
+    if ((!text && !edits) || !diagramType)
       return res.status(400).json({ error: "Missing text or diagramType" });
 
-    const diagram = await generateDiagramFromText(text, diagramType);
+    // with the previous result only the edited part of the text is re-parsed..
+    const diagram = previous
+      ? await updateDiagramFromText(text, diagramType, previous, edits)
+      : await generateDiagramFromText(text, diagramType);
     res.json({ diagram });
   } catch (err) {
     console.error("Error in /diagram:", err);
@@ -0,0 +1,113 @@
+const { PythonShell } = require("python-shell");
+const path = require("path");
+const ML_PATH = path.join(__dirname, "./ML");
+
+// background jobs for big uploads, at most JOB_CONCURRENCY python processes at once..
+const JOB_CONCURRENCY = parseInt(process.env.JOB_CONCURRENCY || "2", 10);
+// per-job limits, enforced inside processor.py (seconds / MB of peak RSS)..
+const JOB_TIMEOUT = parseFloat(process.env.JOB_TIMEOUT || "600");
+const JOB_MAX_MEMORY_MB = process.env.JOB_MAX_MEMORY_MB ? parseInt(process.env.JOB_MAX_MEMORY_MB, 10) : null;
+// SIGKILL if python hasn't exited this long after SIGTERM / its own timeout..
+const KILL_GRACE_MS = 5000;
+// finished jobs stay around this long so the client can fetch the result..
+const JOB_TTL_MS = 10 * 60 * 1000;
+
+const jobs = new Map();
+const queue = [];
+let running = 0;
+let nextJobId = 1;
+
+// job : { mode, file | text, diagram_type }, onFinish(job) runs once it's done/failed/cancelled..
+function submitJob(spec, onFinish = () => {}) {
+  const job = {
+    id: String(nextJobId++),
+    status: "queued",
+    spec: { timeout: JOB_TIMEOUT, max_memory_mb: JOB_MAX_MEMORY_MB, ...spec },
+    progress: {},
+    result: null,
+    error: null,
+    shell: null,
+    onFinish,
+  };
+  jobs.set(job.id, job);
+  queue.push(job);
+  pump();
+  return job.id;
+}
+
+function getJob(id) {
+  const job = jobs.get(id);
+  if (!job) return null;
+  const { status, progress, result, error } = job;
+  return { id, status, progress, result, error };
+}
+
+function cancelJob(id) {
+  const job = jobs.get(id);
+  if (!job) return false;
+  if (job.status === "queued") {
+    queue.splice(queue.indexOf(job), 1);
+    finish(job, "cancelled", null, "Job cancelled");
+  } else if (job.status === "running") {
+    job.cancelled = true;
+    killJob(job);
+  }
+  return true;
+}
+
+function killJob(job) {
+  // python turns SIGTERM into a clean {"error": "Job cancelled"}, SIGKILL is the backstop..
+  job.shell.kill("SIGTERM");
+  setTimeout(() => {
+    if (job.status === "running") job.shell.kill("SIGKILL");
+  }, KILL_GRACE_MS).unref();
+}
+
+function finish(job, status, result, error) {
+  job.status = status;
+  job.result = result;
+  job.error = error;
+  job.shell = null;
+  job.onFinish(job);
+  setTimeout(() => jobs.delete(job.id), JOB_TTL_MS).unref();
+}
+
+function pump() {
+  while (running < JOB_CONCURRENCY && queue.length) startJob(queue.shift());
+}
+
+function startJob(job) {
+  running++;
+  job.status = "running";
+  job.shell = new PythonShell("processor.py", {
+    args: ["job", "--progress"],
+    mode: "json",
+    pythonPath: "python",
+    scriptPath: ML_PATH,
+  });
+
+  let result = null;
+  job.shell.on("message", (msg) => {
+    if (msg.progress) job.progress[msg.progress.stage] = msg.progress;
+    else result = msg;
+  });
+  job.shell.on("stderr", (err) => console.error("Python STDERR:", err));
+
+  // hard stop in case python is stuck somewhere its own alarm can't interrupt..
+  const watchdog = job.spec.timeout
+    ? setTimeout(() => killJob(job), job.spec.timeout * 1000 + KILL_GRACE_MS).unref()
+    : null;
+
+  job.shell.send(job.spec);
+  job.shell.end((err) => {
+    clearTimeout(watchdog);
+    running--;
+    if (job.cancelled) finish(job, "cancelled", null, "Job cancelled");
+    else if (err) finish(job, "failed", null, String(err));
+    else if (!result || result.error) finish(job, "failed", null, result ? result.error : "No result");
+    else finish(job, "done", result, null);
+    pump();
+  });
+}
+
+module.exports = { submitJob, getJob, cancelJob };
@@ -1,6 +1,18 @@
 const { PythonShell } = require("python-shell");
 const path = require("path");
 const ML_PATH = path.join(__dirname, "./ML");
+// no. of warm "processor.py serve" workers, 0 falls back to one process per call..
+const POOL_SIZE = parseInt(process.env.PY_WORKERS || "2", 10);
+// seconds one pooled job may take before its worker is killed, 0 = no limit..
+const POOL_JOB_TIMEOUT_MS = parseFloat(process.env.PY_JOB_TIMEOUT || "300") * 1000;
+
+// with VB_PROFILE=1 python adds per-stage timings, log them and keep the response as before..
+function logTimings(mode, result) {
+  if (!result || !result.timings) return result;
+  console.log(`Python timings (${mode}):`, JSON.stringify({ timings: result.timings, memory: result.memory, startup: result.startup }));
+  return result;
+}
+
 //func. to run python via node..
 function runPython(mode, args = [], inputText = null) {
   return new Promise((resolve, reject) => {
@@ -14,38 +26,136 @@ function runPython(mode, args = [], inputText = null) {
     let output = "";
     pyshell.on("message", (msg) => (output += msg));
     pyshell.on("stderr", (err) => console.error("Python STDERR:", err));
+    // stdin has to be written before end() closes it..
+    if (inputText !== null) pyshell.send(inputText);
     pyshell.end((err) => {
       if (err) return reject(err);
       try {
-        resolve(JSON.parse(output));
+        resolve(logTimings(mode, JSON.parse(output)));
       } catch (e) {
         reject("Failed to parse Python output: " + e);
       }
     });
-    if (inputText) {
-      pyshell.send(inputText);
-      pyshell.end();
+  });
+}
+
+// one-shot job with the whole request as a JSON envelope on stdin, so text never goes through argv..
+function runPythonJob(job) {
+  return runPython("job", [], JSON.stringify(job));
+}
+
+// warm worker pool, model is loaded once per worker instead of once per request..
+const workers = [];
+let nextJobId = 1;
+
+function startWorker() {
+  const worker = {
+    shell: new PythonShell("processor.py", {
+      args: ["serve"],
+      mode: "json",
+      pythonPath: "python",
+      scriptPath: ML_PATH,
+    }),
+    pending: new Map(),
+    dead: false,
+  };
+
+  worker.shell.on("message", (msg) => {
+    const job = worker.pending.get(msg.id);
+    if (!job) return;
+    worker.pending.delete(msg.id);
+    clearTimeout(job.timer);
+    delete msg.id;
+    job.resolve(logTimings(job.mode, msg));
+  });
+  worker.shell.on("stderr", (err) => console.error("Python STDERR:", err));
+  const onError = (err) => failWorker(worker, "Python worker error: " + (err && err.message ? err.message : err));
+  worker.shell.on("error", onError);
+  // writing to a worker that already died is an EPIPE on its stdin, not on the shell..
+  if (worker.shell.stdin) worker.shell.stdin.on("error", onError);
+  worker.shell.on("close", () => failWorker(worker, "Python worker exited"));
+  return worker;
+}
+
+// worker crashed / errored / timed out : drop it from the pool, fail its jobs, make sure it's gone;
+// the next call spawns a fresh one in its place..
+function failWorker(worker, reason) {
+  if (worker.dead) return;
+  worker.dead = true;
+  const idx = workers.indexOf(worker);
+  if (idx !== -1) workers.splice(idx, 1);
+  for (const job of worker.pending.values()) {
+    clearTimeout(job.timer);
+    job.reject(reason);
+  }
+  worker.pending.clear();
+  try {
+    worker.shell.kill("SIGKILL");
+  } catch (e) {
+    // already exited..
+  }
+}
+
+function getWorker() {
+  while (workers.length < POOL_SIZE) workers.push(startWorker());
+  return workers.reduce((a, b) => (b.pending.size < a.pending.size ? b : a));
+}
+
+function runJob(job) {
+  return new Promise((resolve, reject) => {
+    const worker = getWorker();
+    const id = nextJobId++;
+    const pendingJob = { resolve, reject, mode: job.mode, timer: null };
+    if (POOL_JOB_TIMEOUT_MS > 0) {
+      // a stuck job blocks every job queued behind it on that worker, so the worker goes..
+      pendingJob.timer = setTimeout(() => failWorker(worker, "Python job timed out"), POOL_JOB_TIMEOUT_MS);
     }
+    worker.pending.set(id, pendingJob);
+    worker.shell.send({ id, ...job });
   });
 }
 
 // passing summ. to ML..
 async function generateSummary(filePath) {
+  if (POOL_SIZE > 0) return await runJob({ mode: "summary", file: filePath });
   return await runPython("summary", [filePath]);
 }
 
 // passing diag to ML..
 async function generateDiagramFromFile(filePath, diagramType = "flowchart") {
+  if (POOL_SIZE > 0) {
+    return await runJob({ mode: "diagram", file: filePath, diagram_type: diagramType });
+  }
   return await runPython("diagram", [filePath, diagramType]);
 }
 
 // sep. from text to diag. from converting text into valid mermaid inpuyt..
 async function generateDiagramFromText(text, diagramType = "flowchart") {
-  return await runPython("diagram", ["-t", text, diagramType]);
+  if (POOL_SIZE > 0) {
+    return await runJob({ mode: "diagram", text, diagram_type: diagramType });
+  }
+  return await runPythonJob({ mode: "diagram", text, diagram_type: diagramType });
+}
+
+// incremental diag. for live edits, previous = last result (with its state)..
+async function updateDiagramFromText(text, diagramType, previous, edits = null) {
+  const job = { mode: "update", text, diagram_type: diagramType, previous, edits };
+  if (POOL_SIZE === 0) return await runPythonJob(job);
+  return await runJob(job);
+}
+
+// summary + diagram from a single parse of the file..
+async function analyzeFile(filePath, diagramType = "flowchart") {
+  if (POOL_SIZE > 0) {
+    return await runJob({ mode: "analyze", file: filePath, diagram_type: diagramType });
+  }
+  return await runPython("analyze", [filePath, diagramType]);
 }
 
 module.exports = {
+  analyzeFile,
   generateSummary,
   generateDiagramFromFile,
   generateDiagramFromText,
+  updateDiagramFromText,
 };